@@ -0,0 +1,57 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""
+丢包补偿开销：正常解码、丢包补偿（PLC，单帧及连续丢包）与带内 FEC 恢复各自的单帧解码耗时。
+编码参数取自当前配置（默认启用 FEC、预期丢包率 10%），每隔一帧模拟一次丢包。
+在仓库根目录运行：python -m scripts.bench_concealment
+"""
+from time import perf_counter
+from typing import Optional
+
+from numpy import mean, percentile
+
+from scripts.bench_utils import encode_packets
+from src.constants import opus_default_sample_rate
+from src.core.voice.opus import OpusDecoder, SteamArgs
+
+frame_count = 1000  # 编码的 Opus 帧数（20ms 帧即 20 秒音频）
+burst = 3  # 连续丢包的帧数，与抖动缓冲最多连续补偿的帧数一致
+
+
+def timed(decoder: OpusDecoder, payload: Optional[bytes], fec: bool = False) -> float:
+    start = perf_counter()
+    decoder.decode(payload, fec)
+    return perf_counter() - start
+
+
+def bench(args: SteamArgs, packets: list[bytes]) -> dict[str, list[float]]:
+    results: dict[str, list[float]] = {"normal": [], "PLC": [], f"PLC x{burst}": [], "FEC": []}
+    normal, plc, plc_burst, fec = (OpusDecoder(args) for _ in range(4))
+    for packet in packets:
+        results["normal"].append(timed(normal, packet))
+    # 偶数帧正常解码，奇数帧视为丢失
+    for i in range(0, len(packets) - 2, 2):
+        plc.decode(packets[i])
+        results["PLC"].append(timed(plc, None))
+        fec.decode(packets[i])
+        results["FEC"].append(timed(fec, packets[i + 2], True))
+    for i in range(0, len(packets) - burst, burst + 1):
+        plc_burst.decode(packets[i])
+        results[f"PLC x{burst}"].append(sum(timed(plc_burst, None) for _ in range(burst)) / burst)
+    return results
+
+
+def main():
+    args = SteamArgs(opus_default_sample_rate, 1, None, opus_default_sample_rate // 50)
+    packets = encode_packets(args, frame_count)
+    frame_time = args.frame_time / 1000
+    print(f"{args.frame_time} ms frames, {len(packets)} packets, "
+          f"mean packet size {mean([len(packet) for packet in packets]):.1f} bytes")
+    print(f"{'path':>8} {'mean (us)':>10} {'p99 (us)':>10} {'CPU':>7}")
+    for name, samples in bench(args, packets).items():
+        print(f"{name:>8} {mean(samples) * 1e6:>10.1f} {percentile(samples, 99) * 1e6:>10.1f} "
+              f"{mean(samples) / frame_time:>7.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""
+混音开销随发送方数的变化：MixedOutputAudioStream._mix_one_frame（从各发送方的 FIFO 读入混音矩阵，
+与音量向量相乘后原地 tanh），与此前每路一个帧队列、逐路累加到新分配数组后再 tanh 的写法对比。
+只计取帧与混音，不含解码与重采样；不打开音频设备。
+在仓库根目录运行：python -m scripts.bench_mixer
+"""
+from queue import Queue
+from time import perf_counter
+
+from numpy import float32, tanh, zeros
+from numpy.random import default_rng
+from numpy.typing import NDArray
+from pyaudio import PyAudio
+
+from src.constants import default_frame_size
+from src.core.voice.decode_worker import DecodeWorker
+from src.core.voice.opus import OpusDecoderPool, SteamArgs
+from src.core.voice.ring_buffer import AudioRingBuffer
+from src.core.voice.stream import MixedOutputAudioStream, _SenderStream
+
+sender_counts = (1, 2, 4, 8, 16, 32)
+iterations = 2000
+
+
+def loop_mix(queues: list[Queue[NDArray[float32]]], frame_count: int) -> NDArray[float32]:
+    """逐路累加：每帧新分配累加数组，tanh 与类型转换再各分配一次。"""
+    mixed = zeros(frame_count, dtype=float32)
+    for queue in queues:
+        mixed += queue.get_nowait()[:frame_count]
+    return tanh(mixed).astype(float32)
+
+
+def bench_loop(frame: NDArray[float32], senders: int) -> float:
+    queues: list[Queue[NDArray[float32]]] = [Queue() for _ in range(senders)]
+    elapsed = 0.0
+    for _ in range(iterations):
+        for queue in queues:
+            queue.put_nowait(frame.reshape(-1) * 0.5)
+        start = perf_counter()
+        loop_mix(queues, default_frame_size)
+        elapsed += perf_counter() - start
+    return elapsed / iterations
+
+
+def bench_matrix(stream: MixedOutputAudioStream, frame: NDArray[float32], senders: int) -> float:
+    stream._senders.clear()
+    for index in range(senders):
+        sender = _SenderStream(index, AudioRingBuffer(default_frame_size * 2))
+        sender.volume = 0.5
+        stream._senders[(index, index)] = sender
+    # 回调只遍历发送方快照，增删发送方后须重建
+    stream._senders_changed()
+    elapsed = 0.0
+    peak = 0.0
+    for _ in range(iterations):
+        # 每次混音前为各发送方写入一帧（上一次混音已读空 FIFO），补数据不计入耗时
+        for sender in stream._mix_senders:
+            sender.fifo.write(frame)
+        start = perf_counter()
+        mixed = stream._mix_one_frame()
+        elapsed += perf_counter() - start
+        peak = max(peak, float(abs(mixed).max()))
+    if peak == 0.0:
+        raise RuntimeError(f"mixed output of {senders} senders is silent")
+    return elapsed / iterations
+
+
+def main():
+    args = SteamArgs(44100, 1, None, 882)
+    audio = PyAudio()
+    stream = MixedOutputAudioStream(audio, OpusDecoderPool(args), DecodeWorker())
+    stream._prepare(args)
+    frame = (default_rng(1).standard_normal((default_frame_size, 1)) * 0.1).astype(float32)
+    frame_time = args.frame_time / 1000
+    print(f"{default_frame_size} samples per mix, {iterations} iterations")
+    print(f"{'senders':>8} {'queue (us)':>10} {'matrix (us)':>12} {'matrix CPU':>11}")
+    for senders in sender_counts:
+        loop = bench_loop(frame, senders)
+        matrix = bench_matrix(stream, frame, senders)
+        print(f"{senders:>8} {loop * 1e6:>10.1f} {matrix * 1e6:>12.1f} {matrix / frame_time:>11.2%}")
+    audio.terminate()
+
+
+if __name__ == "__main__":
+    main()
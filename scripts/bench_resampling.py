@@ -0,0 +1,82 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""
+接收路径重采样开销对比：每个发送方各自重采样后叠加（旧方式），与按 Opus 采样率混音后每个设备只重采样一次（现方式）。
+两种方式都包含每个发送方的解码，输出为处理一个 Opus 帧的平均耗时及其占帧时长的比例。
+在仓库根目录运行：python -m scripts.bench_resampling [设备采样率]
+"""
+from sys import argv
+from time import perf_counter
+
+from numpy import dot, float32, tanh, zeros
+
+from scripts.bench_utils import encode_packets
+from src.constants import opus_default_sample_rate
+from src.core.voice.opus import OpusDecoderPool, SteamArgs
+from src.core.voice.resampler import StreamResampler
+from src.core.voice.ring_buffer import AudioRingBuffer
+
+talker_counts = (1, 4, 16)
+frame_count = 500  # 每种情形处理的 Opus 帧数（20ms 帧即 10 秒音频）
+
+
+def per_sender(args: SteamArgs, packets: list[bytes], talkers: int) -> float:
+    """旧方式：每个发送方一个重采样器，重采样到设备采样率后叠加。"""
+    pool = OpusDecoderPool(args)
+    device_frame = args.sample_rate * args.frame_time // 1000
+    resamplers = [StreamResampler(opus_default_sample_rate, args.sample_rate) for _ in range(talkers)]
+    frame = zeros((device_frame, 1), dtype=float32)
+    mixed = zeros((device_frame, 1), dtype=float32)
+    start = perf_counter()
+    for packet in packets:
+        mixed[:] = 0
+        for talker, resampler in enumerate(resamplers):
+            audio_data = pool.get((talker, 0)).decode(packet)
+            if audio_data is not None:
+                resampler.push(audio_data.reshape(-1, 1))
+            n = resampler.pull_into(frame)
+            mixed[:n] += frame[:n]
+        tanh(mixed, out=mixed)
+    return (perf_counter() - start) / len(packets)
+
+
+def per_device(args: SteamArgs, packets: list[bytes], talkers: int) -> float:
+    """现方式：解码结果写入各发送方的 FIFO，按 Opus 采样率混音，混音结果经设备唯一的重采样器。"""
+    pool = OpusDecoderPool(args)
+    size = args.opus_frame_size
+    fifos = [AudioRingBuffer(size * 4) for _ in range(talkers)]
+    matrix = zeros((talkers, size), dtype=float32)
+    gains = zeros(talkers, dtype=float32) + 1.0
+    out = zeros(size, dtype=float32)
+    output = StreamResampler(opus_default_sample_rate, args.sample_rate)
+    frame = zeros((args.sample_rate * args.frame_time // 1000, 1), dtype=float32)
+    start = perf_counter()
+    for packet in packets:
+        for talker, fifo in enumerate(fifos):
+            audio_data = pool.get((talker, 0)).decode(packet)
+            if audio_data is not None:
+                fifo.write(audio_data.reshape(-1, 1))
+            fifo.read_into(matrix[talker].reshape(-1, 1))
+        dot(gains, matrix, out=out)
+        tanh(out, out=out)
+        output.push(out.reshape(-1, 1))
+        output.pull_into(frame)
+    return (perf_counter() - start) / len(packets)
+
+
+def main():
+    sample_rate = int(argv[1]) if len(argv) > 1 else 44100
+    args = SteamArgs(sample_rate, 1, None, sample_rate // 50)
+    packets = encode_packets(SteamArgs(opus_default_sample_rate, 1, None, args.opus_frame_size), frame_count)
+    frame_time = args.frame_time / 1000
+    print(f"{opus_default_sample_rate} Hz -> {sample_rate} Hz, {args.frame_time} ms frames, {len(packets)} frames")
+    print(f"{'talkers':>8} {'per sender (us)':>16} {'per device (us)':>16} {'CPU (old/new)':>16}")
+    for talkers in talker_counts:
+        old = per_sender(args, packets, talkers)
+        new = per_device(args, packets, talkers)
+        print(f"{talkers:>8} {old * 1e6:>16.1f} {new * 1e6:>16.1f} "
+              f"{old / frame_time:>7.1%} / {new / frame_time:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
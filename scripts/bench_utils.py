@@ -0,0 +1,24 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""各基准脚本共用的测试数据。"""
+from numpy import float32, linspace, sin
+from numpy.random import default_rng
+
+from src.constants import opus_default_sample_rate
+from src.core.voice.opus import OpusEncoder, SteamArgs
+
+
+def encode_packets(args: SteamArgs, count: int) -> list[bytes]:
+    """编码一段类语音信号（带包络的谐波加噪声），得到 count 个 Opus 包。"""
+    encoder = OpusEncoder(args)
+    size = encoder.frame_size
+    t = linspace(0, count * size / opus_default_sample_rate, count * size, endpoint=False)
+    signal = 0.3 * sin(2 * 3.14159 * 180 * t) * (0.6 + 0.4 * sin(2 * 3.14159 * 3 * t))
+    signal += 0.05 * default_rng(1).standard_normal(t.size)
+    signal = signal.astype(float32)
+    packets = []
+    for i in range(count):
+        packet = encoder.encode(signal[i * size:(i + 1) * size])
+        if packet:
+            packets.append(packet)
+    return packets
@@ -0,0 +1,129 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""
+检查各音频流的 PortAudio 回调在稳定状态下不分配内存：预热后用 tracemalloc 快照比较运行前后仍存活的内存，
+净增长必须为 0，任何逐次回调累积的分配（泄漏、不断增长的缓存）都会使检查失败。
+不打开音频设备，直接以 _prepare 分配的缓冲驱动 _callback。
+
+不计入净增长的分配：本脚本自身（送入数据、计数变量）与 tracemalloc 的快照；
+soxr 扩展内部的小对象（每次几十字节，长时间运行后在上下一个对象之间波动，不随调用次数增长）。
+soxr 的输出数组由扩展直接分配，不经过 Python 的内存分配器，tracemalloc 统计不到。
+
+另外允许回调期间有小的瞬时峰值：NumPy 切片视图的数组头、超出小整数缓存的读写计数等短命对象无法避免，
+回调返回前即已释放。峰值以「小于一个设备帧的 int16 样本字节数」为界，任何帧大小的临时数组都会超过该值。
+在仓库根目录运行：python -m scripts.check_callback_alloc，存在净增长或峰值超限时以非零状态退出。
+"""
+import tracemalloc
+from gc import collect
+from itertools import repeat
+from os.path import dirname
+from sys import exit
+from typing import Callable
+
+import soxr  # type: ignore
+from numpy import float32, full, int16, zeros
+from pyaudio import PyAudio
+
+from src.constants import opus_default_sample_rate
+from src.core.voice.decode_worker import DecodeWorker
+from src.core.voice.opus import OpusDecoder, OpusDecoderPool, OpusEncoder, SteamArgs
+from src.core.voice.ring_buffer import AudioRingBuffer
+from src.core.voice.stream import InputAudioSteam, MixedOutputAudioStream, OutputAudioSteam, _SenderStream
+
+warmup = 100
+iterations = 500
+senders = 4
+
+# 不计入净增长的分配位置（文件路径前缀）
+_excluded = (__file__, tracemalloc.__file__, dirname(soxr.__file__))
+
+
+def measure(feed: Callable[[], None], callback: Callable[[], object]) -> tuple[int, int]:
+    """返回 (稳定状态下的净增长, 单次回调期间的最大峰值增量)，单位字节。"""
+    tracemalloc.start()
+    # 预热期间即开始跟踪：回调中被替换的对象（如读写计数）在比较前后都是被跟踪的
+    for _ in repeat(None, warmup):
+        feed()
+        callback()
+    collect()
+    start = tracemalloc.take_snapshot()
+    worst = 0
+    for _ in repeat(None, iterations):
+        feed()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        callback()
+        worst = max(worst, tracemalloc.get_traced_memory()[1] - before)
+    collect()
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(stat.size_diff for stat in end.compare_to(start, "filename")
+                 if not stat.traceback[0].filename.startswith(_excluded))
+    return growth, worst
+
+
+def check_input(audio: PyAudio, args: SteamArgs) -> tuple[int, int]:
+    stream = InputAudioSteam(audio, OpusEncoder(args), lambda _: None)
+    stream._prepare(args)
+    stream.input_active = True
+    block = zeros(args.frame_size, dtype=int16).tobytes()
+    frame_count = args.frame_size // args.channel
+    capture = stream._capture
+    assert capture is not None
+    # 编码线程不运行，每次回调前清空采集缓冲
+    return measure(capture.clear, lambda: stream._callback(block, frame_count, None, 0))
+
+
+def check_output(audio: PyAudio, args: SteamArgs) -> tuple[int, int]:
+    stream = OutputAudioSteam(audio, OpusDecoder(args))
+    stream._prepare(args)
+    frame_count = args.frame_size // args.channel
+    resampler = stream._resampler
+    assert resampler is not None
+    pcm = full((args.opus_frame_size, 1), 0.1, dtype=float32)
+
+    def feed():
+        if resampler.available < frame_count:
+            resampler.push(pcm)
+
+    return measure(feed, lambda: stream._callback(None, frame_count, None, 0))
+
+
+def check_mixed(audio: PyAudio, args: SteamArgs) -> tuple[int, int]:
+    stream = MixedOutputAudioStream(audio, OpusDecoderPool(args), DecodeWorker())
+    stream._prepare(args)
+    frame_count = args.frame_size // args.channel
+    pcm = full((args.opus_frame_size, 1), 0.1, dtype=float32)
+    for index in range(senders):
+        stream._senders[(index, index)] = _SenderStream(index, AudioRingBuffer(args.opus_frame_size * 4))
+    stream._senders_changed()
+
+    def feed():
+        for sender in stream._mix_senders:
+            if sender.fifo.available < args.opus_frame_size * 2:
+                sender.fifo.write(pcm)
+
+    return measure(feed, lambda: stream._callback(None, frame_count, None, 0))
+
+
+def main():
+    audio = PyAudio()
+    failed = False
+    print(f"{'stream':>8} {'rate':>6} {'ch':>3} {'growth':>7} {'limit':>6} {'peak':>6}")
+    for sample_rate in (44100, opus_default_sample_rate):
+        for channel in (1, 2):
+            frame_count = sample_rate // 50
+            args = SteamArgs(sample_rate, channel, None, frame_count * channel)
+            # 一个设备帧的 int16 单声道样本字节数，小于回调处理的任何一个缓冲
+            limit = frame_count * 2
+            for name, check in (("input", check_input), ("output", check_output), ("mixed", check_mixed)):
+                growth, peak = check(audio, args)
+                bad = growth != 0 or peak >= limit
+                failed |= bad
+                print(f"{name:>8} {sample_rate:>6} {channel:>3} {growth:>7} {limit:>6} {peak:>6}"
+                      f"{'  FAILED' if bad else ''}")
+    audio.terminate()
+    exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
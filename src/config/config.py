@@ -46,6 +46,18 @@ class AudioConfig(BaseModel):
     ptt_play_device: str = "耳机"  # 提示音播放设备：耳机 / 扬声器
     conflict_volume: float = 1.0
     conflict_play_device: str = "扬声器"  # 冲突音播放设备：耳机 / 扬声器
+    device_test_mode: str = "直接监听"  # 设备测试的试听方式：直接监听 / 编码后（经 Opus 编解码，即他人听到的效果）
+    frame_time: int = 20  # Opus 帧时长（ms）：10 / 20 / 40 / 60，帧越长延迟越大、包速率越低
+    opus_fec: bool = True  # 编码时启用 Opus 带内 FEC
+    opus_expected_loss: int = 10  # 预期丢包率（%），决定 FEC 冗余强度
+    opus_dtx: bool = False  # 按下 PTT 期间静音不发送（DTX）
+    vad_threshold: float = -50.0  # 静音判定门限（dBFS）
+    adaptive_bitrate: bool = True  # 按链路 RTT 与丢包率自动调整编码码率、带宽与 FEC
+    min_bitrate: int = 12000  # 自适应码率下限（bps）
+    max_bitrate: int = 32000  # 自适应码率上限（bps）
+    encoder_profile: str = "standard"  # 编码器档位：low_cpu / balanced / standard / quality，复杂度越低占用 CPU 越少
+    input_channel: int = -1  # 多声道麦克风取用的声道：-1 为各声道平均，0 起为只取该声道
+    max_playout_backlog: int = 200  # 每个发送方待播放音频的上限（ms），超出时丢弃最旧的帧追赶
 
 
 class Config(BaseModel):
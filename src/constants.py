@@ -30,6 +30,66 @@ default_frame_time: int = 20  # ms
 default_frame_time_s: float = default_frame_time / 1000  # s
 # 音频帧大小
 default_frame_size: int = int(opus_default_sample_rate / (1000 / default_frame_time))
+# 可选的 Opus 帧时长，运行时由配置 audio.frame_time 选择
+opus_frame_times: tuple[int, ...] = (10, 20, 40, 60)  # ms
+# 单个 Opus 包最多可携带 120ms 音频（每声道样本数）
+opus_max_frame_size: int = opus_default_sample_rate * 120 // 1000
+# 编码输出缓冲大小（字节），libopus 推荐的单包上限
+opus_max_packet_size: int = 4000
+# 每路输出的 Opus 解码器池容量（按发送方分配解码器）
+opus_decoder_pool_capacity: int = 16
+# 解码器空闲超过该时长后可被回收
+opus_decoder_idle_timeout: float = 30.0  # s
+# 抖动缓冲最小/最大深度（帧）
+jitter_buffer_min_depth: int = 2
+jitter_buffer_max_depth: int = 10
+# 缓冲为空时最多连续补偿的帧数，超过后输出静音
+jitter_buffer_max_conceal: int = 3
+# 超过该时长未收到数据视为发送方已停止发送，下次收包时重新缓冲
+jitter_buffer_spurt_timeout: float = default_frame_time_s * 10  # s
+# 解码线程为每个发送方提前解码的样本数（Opus 采样率），即解码线程引入的额外延迟
+decode_ahead_size: int = default_frame_size * 2
+# 播放端环形缓冲（解码后 PCM、冲突音/提示音）的容量，同时是这些缓冲带来的最大延迟
+audio_ring_buffer_time: float = 0.5  # s
+# 设备测试的直接监听：播放端积压超过该时长时丢弃最旧的样本，避免输入/输出设备的时钟偏差使延迟越积越大
+monitor_max_backlog: float = default_frame_time_s * 3  # s
+# 设备测试的往返延迟：按播放回调中测得的样本延迟平滑，并按该间隔（ms）报告给配置窗口
+monitor_latency_smoothing: float = 1 / 16
+device_test_latency_interval: int = 500  # ms
+# 时钟漂移补偿：开始播放后以前若干次测量的平均缓冲时长为基准，平滑后的缓冲时长偏离基准超过死区时逐帧增减一个样本
+drift_settle_updates: int = 50
+drift_deadband: float = default_frame_time_s / 2  # s
+drift_smoothing: float = 1 / 32
+# DTX：静音期间每隔该帧数发送一个 DTX 包，告知接收端发送方仍在发射
+opus_dtx_keepalive_frames: int = 20
+# 能量门限判定为静音后仍继续发送的帧数，避免切掉词尾
+vad_hangover_frames: int = 10
+# 提示音与冲突音：振幅、冲突音频率、提示音首尾淡入淡出时长，以及渲染好的音频缓存容量
+tone_amplitude: float = 0.3
+conflict_tone_frequency: float = 293.66  # Hz
+tone_fade_time: float = 0.005  # s
+tone_cache_capacity: int = 32
+# 会话期间定时把音频诊断信息写入调试日志的间隔
+diagnostics_log_interval: int = 30000  # ms
+# 自适应码率：评估间隔
+bitrate_adapt_interval: int = 2000  # ms
+# 接收丢包率或 RTT 超过上限时降码率，均低于下限时才允许升码率，两者之间保持不变
+bitrate_loss_high: float = 0.05
+bitrate_loss_low: float = 0.02
+bitrate_rtt_high: float = 0.4  # s
+bitrate_rtt_low: float = 0.2  # s
+# 降码率按比例快降，升码率需连续多次评估良好后按固定步长慢升
+bitrate_decrease_factor: float = 0.8
+bitrate_increase_step: int = 2000  # bps
+bitrate_increase_hold: int = 5
+# 一次评估内接收帧数少于该值时丢包率不可信，只按 RTT 判断
+bitrate_min_loss_samples: int = 50
+# 按实测丢包率提高 FEC 预期丢包率的上限（%）
+opus_max_expected_loss: int = 30
+
+# 收听状态汇总：UI 刷新间隔，以及超过该时长未收到语音包视为对方已停止发射
+voice_activity_interval: int = 50  # ms
+voice_activity_timeout: float = default_frame_time_s * 10  # s
 
 # 会话保持：登录后后台刷新主 token 的间隔（分钟）
 session_refresh_interval_minutes: int = 10
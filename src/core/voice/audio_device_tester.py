@@ -1,50 +1,120 @@
 #  Copyright (c) 2026 Half_nothing
 #  SPDX-License-Identifier: MIT
-"""配置页「耳机测试/扬声器测试」：麦克风 -> 编码 -> 指定设备播放，用于试听设备。"""
+"""
+配置页「耳机测试/扬声器测试」：麦克风 -> 指定设备播放，用于试听设备。
+试听方式有两种：直接监听（采集的 PCM 只经重采样直接播放，延迟最低、几乎不占 CPU），
+以及编码后（经 Opus 编码再解码，即其他人听到的效果）。
+"""
+from typing import Optional
+
+from PySide6.QtCore import QTimer
+from numpy import float32
+from numpy.typing import NDArray
 from pyaudio import PyAudio
 
+from src.config import config
+from src.constants import device_test_latency_interval, opus_default_sample_rate
 from src.signal import AudioClientSignals
 from .opus import OpusDecoder, OpusEncoder, SteamArgs
 from .stream import InputAudioSteam, OutputAudioSteam
 
 
 class AudioDeviceTester:
-    """试听管道：输入流编码后通过 on_encoded_audio 送入输出流，支持切换输入/输出设备。"""
+    """
+    试听管道：直接监听时输入流通过 on_captured_audio 把 PCM 送入输出流，编码后时通过 on_encoded_audio 送入编码数据，
+    支持切换输入/输出设备与试听方式。试听期间定时测量当前方式的往返延迟，连同另一方式最近测得的延迟一起报告。
+    """
 
     def __init__(self, signals: AudioClientSignals, audio: PyAudio, encoder: OpusEncoder, decoder: OpusDecoder, /):
         super().__init__()
         self.active = False
+        self._signals = signals
+        self._encoder = encoder
         self.input_stream = InputAudioSteam(audio, encoder)
         self.output_stream = OutputAudioSteam(audio, decoder)
-        self.input_stream.on_encoded_audio = self._on_encode_audio
+        self._input_args: Optional[SteamArgs] = None
+        self._output_args: Optional[SteamArgs] = None
+        self._codec = False
+        self._latency: dict[str, float] = {"直接监听": -1.0, "编码后": -1.0}  # 各试听方式最近测得的往返延迟（ms），-1 为未测得
+        self._latency_timer = QTimer()
+        self._latency_timer.setInterval(device_test_latency_interval)
+        self._latency_timer.timeout.connect(self._report_latency)
+        self._set_mode(config.audio.device_test_mode)
         signals.ptt_status_change.connect(self._ptt_status_change)
         signals.microphone_gain_changed.connect(self._microphone_gain_change)
+        signals.device_test_mode_changed.connect(self._device_test_mode_change)
+
+    @property
+    def mode(self) -> str:
+        return "编码后" if self._codec else "直接监听"
+
+    @property
+    def latency(self) -> dict[str, float]:
+        return dict(self._latency)
+
+    def _set_mode(self, mode: str) -> None:
+        self._codec = mode == "编码后"
+        if self._codec:
+            self.input_stream.on_captured_audio = None
+            self.input_stream.on_encoded_audio = self._on_encode_audio
+        else:
+            self.input_stream.on_encoded_audio = None
+            self.input_stream.on_captured_audio = self._on_captured_audio
+
+    def _device_test_mode_change(self, mode: str):
+        if (mode == "编码后") == self._codec:
+            return
+        self._set_mode(mode)
+        # 重新打开两路流，清空上一种方式残留的缓冲与延迟测量
+        if self.active and self._input_args is not None and self._output_args is not None:
+            self.input_stream.restart(self._input_args)
+            self.output_stream.restart(self._output_args)
 
     def _microphone_gain_change(self, gain: int):
         self.input_stream.gain = gain
 
     def update_input_device(self, input_arg: SteamArgs):
+        self._input_args = input_arg
         if self.input_stream.active:
             self.input_stream.restart(input_arg)
 
     def update_output_device(self, output_arg: SteamArgs):
+        self._output_args = output_arg
         if self.output_stream.active:
             self.output_stream.restart(output_arg)
 
     def _ptt_status_change(self, status: bool):
         self.input_stream.input_active = status
 
+    def _on_captured_audio(self, audio_data: NDArray[float32], sample_rate: int):
+        self.output_stream.play_pcm(audio_data, sample_rate, self.input_stream.sample_time)
+
     def _on_encode_audio(self, data: bytes):
-        self.output_stream.play_encoded_audio(data)
+        # 解码出的音频比编码器输入晚一个编码器算法延迟
+        captured_at = self.input_stream.sample_time - self._encoder.lookahead / opus_default_sample_rate
+        self.output_stream.play_encoded_audio(data, captured_at=captured_at)
+
+    def _report_latency(self):
+        latency = self.output_stream.latency
+        if latency <= 0:
+            return
+        # 往返延迟：设备输入延迟 + 采集到写入设备缓冲 + 设备输出延迟
+        latency += self.input_stream.device_latency + self.output_stream.device_latency
+        self._latency[self.mode] = round(latency * 1000, 1)
+        self._signals.device_test_latency_changed.emit(self.latency)
 
     def start(self, input_arg: SteamArgs, output_arg: SteamArgs):
         """开始试听：启动输入与输出流。"""
         self.active = True
+        self._input_args = input_arg
+        self._output_args = output_arg
         self.input_stream.start(input_arg)
         self.output_stream.start(output_arg)
+        self._latency_timer.start()
 
     def stop(self):
         """停止试听。"""
+        self._latency_timer.stop()
         self.input_stream.stop()
         self.output_stream.stop()
         self.active = False
@@ -1,48 +1,73 @@
 #  Copyright (c) 2025-2026 Half_nothing
 #  SPDX-License-Identifier: MIT
 """
-音频处理器：统一管理麦克风输入、耳机/扬声器双路混合输出、PTT 提示音、冲突音、设备测试与设备切换。
+音频处理器：统一管理麦克风输入、耳机/扬声器双路混合输出（同一设备时合并为一路）、PTT 提示音、冲突音、设备测试与设备切换。
 """
+from dataclasses import asdict
 from typing import Callable, Optional
 
 from PySide6.QtCore import QTimer, Qt
 from loguru import logger
-from pyaudio import PyAudio
+from pyaudio import PyAudio, paFloat32, paInt16
 
 from src.config import config
-from src.constants import default_channels, default_frame_size, default_frame_time, default_sample_rate, \
-    max_stream_channels, opus_default_sample_rate
-from src.model import DeviceInfo
+from src.constants import bitrate_adapt_interval, default_channels, default_frame_size, default_frame_time, \
+    default_sample_rate, diagnostics_log_interval, max_stream_channels, opus_default_sample_rate, opus_frame_times, \
+    tone_amplitude
+from src.model import DeviceInfo, VoicePacket
 from src.signal import AudioClientSignals
 from .audio_device_tester import AudioDeviceTester
-from .opus import OpusDecoder, OpusEncoder, SteamArgs
-from .stream import InputAudioSteam, MixedOutputAudioStream
-from .tone_generator import ToneGenerator
+from .bitrate_controller import BitrateController
+from .decode_worker import DecodeWorker
+from .opus import EncoderProfile, OpusDecoder, OpusDecoderPool, OpusEncoder, SteamArgs, default_encoder_profile, \
+    encoder_profiles
+from .stream import InputAudioSteam, MixedOutputAudioStream, OutputAudioSteam
+from .tone_generator import ToneCache
 from .transmitter import Transmitter, OutputTarget
 
 
 class AudioHandler:
-    """管理输入流、双路混合输出（耳机/扬声器）、PTT 提示音、冲突音音量、设备测试；按 transmitter.output_target 路由播放。"""
+    """
+    管理输入流、双路混合输出（耳机/扬声器）、PTT 提示音、冲突音音量、设备测试；按 transmitter.output_target 路由播放。
+    耳机与扬声器是同一设备时只打开耳机一路，扬声器的 transmitter 也由这一路解码混音，之后选了不同设备时再拆分。
+    """
 
     def __init__(self, audio_signal: AudioClientSignals):
         self._input_args = SteamArgs(default_sample_rate, default_channels, None, default_frame_size)
         self._output_args = SteamArgs(default_sample_rate, default_channels, None, default_frame_size)
         self._output_args_speaker = SteamArgs(default_sample_rate, default_channels, None, default_frame_size)
 
-        self._encoder = OpusEncoder(self._input_args)
-        self._decoder_headphone = OpusDecoder(self._output_args)
-        self._decoder_speaker = OpusDecoder(self._output_args_speaker)
+        self._encoder = OpusEncoder(self._input_args, self._encoder_profile(config.audio.encoder_profile))
+        # 自适应码率：定时按接收丢包率与 PING/PONG 往返时延调整编码参数
+        self._bitrate_controller = BitrateController()
+        self._link_counters: tuple[int, int] = (0, 0)
+        self._bitrate_timer = QTimer()
+        self._bitrate_timer.setInterval(bitrate_adapt_interval)
+        self._bitrate_timer.timeout.connect(self._adapt_bitrate)
+        # 会话期间定时输出诊断信息，便于从用户日志排查卡顿、丢包与设备问题
+        self._diagnostics_timer = QTimer()
+        self._diagnostics_timer.setInterval(diagnostics_log_interval)
+        self._diagnostics_timer.timeout.connect(self._log_diagnostics)
+        # 每路输出按发送方 (cid, transmitter) 分配独立解码器
+        self._decoder_pool_headphone = OpusDecoderPool(self._output_args)
+        self._decoder_pool_speaker = OpusDecoderPool(self._output_args_speaker)
         self._decoder_tester = OpusDecoder(self._output_args)
 
         self._audio = PyAudio()
         self._input_stream = InputAudioSteam(self._audio, self._encoder)
-        self._mixed_output_headphone = MixedOutputAudioStream(self._audio, self._decoder_headphone)
-        self._mixed_output_speaker = MixedOutputAudioStream(self._audio, self._decoder_speaker)
+        # 两路混合输出共用一个解码线程，解码不占用 Qt 主线程与播放回调
+        self._decode_worker = DecodeWorker()
+        self._mixed_output_headphone = MixedOutputAudioStream(self._audio, self._decoder_pool_headphone,
+                                                              self._decode_worker)
+        self._mixed_output_speaker = MixedOutputAudioStream(self._audio, self._decoder_pool_speaker,
+                                                            self._decode_worker)
+        # 两路参数的设备一致（默认均为系统默认设备）
+        self._shared_output = True
 
-        # 用于 PTT 提示音的专用 ToneGenerator（按下/松开各一个），
-        # 在此处创建并在输出设备变更时更新采样率。
-        self._ptt_press_tone = ToneGenerator(default_sample_rate, config.audio.ptt_press_freq, 0.3)
-        self._ptt_release_tone = ToneGenerator(default_sample_rate, config.audio.ptt_release_freq, 0.3)
+        # PTT 提示音按 (频率, 采样率, 振幅, 帧数, 声道数) 缓存渲染好的波形，按下 PTT 时只需写入冲突缓冲
+        self._tone_cache = ToneCache()
+        self._ptt_press_freq = config.audio.ptt_press_freq
+        self._ptt_release_freq = config.audio.ptt_release_freq
         self._beep_volume = config.audio.ptt_volume
 
         self._device_tester = AudioDeviceTester(audio_signal, self._audio, self._encoder, self._decoder_tester)
@@ -61,18 +86,25 @@ class AudioHandler:
         self.audio_signal.audio_output_device_speaker_change.connect(self._output_device_speaker_change)
         self.audio_signal.test_audio_device.connect(self._test_audio_device, Qt.ConnectionType.QueuedConnection)
         self.audio_signal.microphone_gain_changed.connect(self._microphone_gain_change)
-        self.audio_signal.ptt_press_freq_changed.connect(
-            lambda freq: self._ptt_press_tone.update_frequency(freq)
-        )
-        self.audio_signal.ptt_release_freq_changed.connect(
-            lambda freq: self._ptt_release_tone.update_frequency(freq)
-        )
+        self.audio_signal.ptt_press_freq_changed.connect(self._ptt_press_freq_change)
+        self.audio_signal.ptt_release_freq_changed.connect(self._ptt_release_freq_change)
         self.audio_signal.ptt_volume_changed.connect(self.ptt_beep_volume_change)
         self.audio_signal.conflict_volume_changed.connect(self._conflict_volume_change)
 
     def ptt_beep_volume_change(self, volume: float):
         self._beep_volume = volume
 
+    def _ptt_press_freq_change(self, frequency: float):
+        old, self._ptt_press_freq = self._ptt_press_freq, frequency
+        # 旧频率仍被松开提示音使用时保留其缓存
+        if old != frequency and old != self._ptt_release_freq:
+            self._tone_cache.discard(frequency=old)
+
+    def _ptt_release_freq_change(self, frequency: float):
+        old, self._ptt_release_freq = self._ptt_release_freq, frequency
+        if old != frequency and old != self._ptt_press_freq:
+            self._tone_cache.discard(frequency=old)
+
     def _conflict_volume_change(self, volume: float):
         self._conflict_volume = volume
 
@@ -84,6 +116,27 @@ class AudioHandler:
     def on_encoded_audio(self, on_encoded_audio: Callable[[bytes], None]):
         self._input_stream.on_encoded_audio = on_encoded_audio
 
+    def report_rtt(self, rtt: float) -> None:
+        """记录一次信令往返时延（秒），供自适应码率使用。"""
+        self._bitrate_controller.report_rtt(rtt)
+
+    def _link_stats(self) -> tuple[int, int]:
+        received_headphone, lost_headphone = self._mixed_output_headphone.link_stats
+        received_speaker, lost_speaker = self._mixed_output_speaker.link_stats
+        return received_headphone + received_speaker, lost_headphone + lost_speaker
+
+    def _adapt_bitrate(self) -> None:
+        # 没有上行丢包反馈，以同一链路上接收各发送方语音的丢包率近似
+        received, lost = self._link_stats()
+        last_received, last_lost = self._link_counters
+        self._link_counters = (received, lost)
+        settings = self._bitrate_controller.evaluate(received - last_received, lost - last_lost)
+        if settings is None:
+            return
+        logger.debug(f"AudioHandler > encoder settings adapted: bitrate {settings.bitrate} bps, "
+                     f"bandwidth {settings.bandwidth}, expected loss {settings.expected_loss}%")
+        self._encoder.apply_settings(settings)
+
     def _microphone_gain_change(self, gain: int):
         self._input_stream.gain = gain
 
@@ -91,13 +144,16 @@ class AudioHandler:
         self._input_stream.input_active = status
 
     def _ptt_beep(self, pressed: bool) -> None:
-        tone = self._ptt_press_tone if pressed else self._ptt_release_tone
+        frequency = self._ptt_press_freq if pressed else self._ptt_release_freq
+        stream: OutputAudioSteam | MixedOutputAudioStream
         if self._device_tester.active:
-            wave = tone.generate_frame(self._device_tester.output_stream.frame_size) * 0.5 * self._beep_volume
-            self._device_tester.output_stream.enqueue_conflict_wave(wave)
+            stream = self._device_tester.output_stream
+        else:
+            stream = self._stream_for_play_device(config.audio.ptt_play_device)
+        if stream.frame_size <= 0:
             return
-        stream = self._stream_for_play_device(config.audio.ptt_play_device)
-        wave = tone.generate_frame(stream.frame_size) * 0.5 * self._beep_volume
+        wave = self._tone_cache.beep(frequency, stream.sample_rate, tone_amplitude * 0.5 * self._beep_volume,
+                                     stream.frame_size // stream.channel)
         stream.enqueue_conflict_wave(wave)
 
     def _test_audio_device(self, state: bool, target: str):
@@ -124,16 +180,70 @@ class AudioHandler:
             if self._conflict_test_timer.isActive():
                 self._conflict_test_timer.stop()
 
+    def _preferred_sample_rate(self, info: DeviceInfo, channel: int, is_input: bool) -> int:
+        """优先以 Opus 采样率打开设备，此时收发两个方向都无需重采样；设备不支持时退回其默认采样率。"""
+        try:
+            if is_input:
+                supported = self._audio.is_format_supported(opus_default_sample_rate, input_device=info.index,
+                                                            input_channels=channel, input_format=paInt16)
+            else:
+                supported = self._audio.is_format_supported(opus_default_sample_rate, output_device=info.index,
+                                                            output_channels=channel, output_format=paFloat32)
+        except ValueError:
+            supported = False
+        if supported:
+            return opus_default_sample_rate
+        logger.debug(f"AudioHandler > device {info.name} does not support {opus_default_sample_rate} Hz, "
+                     f"using {int(info.defaultSampleRate)} Hz")
+        return int(info.defaultSampleRate)
+
+    @staticmethod
+    def _device_frame_size(args: SteamArgs) -> int:
+        """设备每次回调的样本数：一个 Opus 帧时长对应的设备帧数乘以声道数。"""
+        return int(args.opus_frame_size * args.sample_rate / opus_default_sample_rate) * args.channel
+
+    @property
+    def frame_time(self) -> int:
+        """本次会话发送所用的 Opus 帧时长（ms）。"""
+        return self._input_args.frame_time
+
+    def _apply_frame_time(self, frame_time: int) -> None:
+        if frame_time not in opus_frame_times:
+            logger.warning(f"AudioHandler > unsupported frame time {frame_time} ms, using {default_frame_time} ms")
+            frame_time = default_frame_time
+        if frame_time == self._input_args.frame_time:
+            return
+        self._input_args.frame_time = frame_time
+        self._input_args.frame_size = self._device_frame_size(self._input_args)
+        self._encoder.update(self._input_args)
+        logger.debug(f"AudioHandler > opus frame time set to {frame_time} ms")
+
+    @staticmethod
+    def _encoder_profile(name: str) -> EncoderProfile:
+        profile = encoder_profiles.get(name)
+        if profile is None:
+            logger.warning(f"AudioHandler > unknown encoder profile {name}, using {default_encoder_profile}")
+            profile = encoder_profiles[default_encoder_profile]
+            # 写回配置，之后的会话不再重复告警
+            config.audio.encoder_profile = profile.name
+        return profile
+
+    def _apply_encoder_profile(self, name: str) -> None:
+        profile = self._encoder_profile(name)
+        if profile == self._encoder.profile:
+            return
+        # 应用模式只能在创建编码器时指定，按新档位重建编码器
+        self._encoder.update(self._input_args, profile)
+        logger.debug(f"AudioHandler > opus encoder profile set to {self._encoder.profile.name}")
+
     def _input_device_change(self, info: Optional[DeviceInfo]):
         if info is None:
             info = DeviceInfo.model_validate(self._audio.get_default_input_device_info())
         logger.debug(f"AudioHandler > input device change: {info}")
         self._input_args.device_index = info.index
         self._input_args.channel = min(max(info.maxInputChannels // 2, default_channels), max_stream_channels)
-        self._input_args.sample_rate = int(info.defaultSampleRate)
-        self._input_args.frame_size = int(
-            default_frame_size * self._input_args.sample_rate / opus_default_sample_rate
-        ) * self._input_args.channel
+        self._input_args.sample_rate = self._preferred_sample_rate(info, self._input_args.channel, True)
+        self._input_args.frame_size = self._device_frame_size(self._input_args)
         self._encoder.update(self._input_args)
         self._device_tester.update_input_device(self._input_args)
         if not self._input_stream.active:
@@ -146,18 +256,11 @@ class AudioHandler:
         logger.debug(f"AudioHandler > output device (headphone) change: {info}")
         self._output_args.device_index = info.index
         self._output_args.channel = min(max(info.maxOutputChannels // 2, default_channels), max_stream_channels)
-        self._output_args.sample_rate = int(info.defaultSampleRate)
-        self._output_args.frame_size = int(
-            default_frame_size * self._output_args.sample_rate / opus_default_sample_rate
-        ) * self._output_args.channel
-        self._decoder_headphone.update(self._output_args)
-        self._ptt_press_tone.update_sample_rate(self._output_args.sample_rate)
-        self._ptt_release_tone.update_sample_rate(self._output_args.sample_rate)
+        self._output_args.sample_rate = self._preferred_sample_rate(info, self._output_args.channel, False)
+        self._output_args.frame_size = self._device_frame_size(self._output_args)
+        self._mixed_output_headphone.update_decoder_pool(self._output_args)
         self._device_tester.update_output_device(self._output_args)
-        if self._mixed_output_headphone.active:
-            self._mixed_output_headphone.restart(self._output_args)
-        if self._mixed_output_speaker.active:
-            self._mixed_output_speaker.restart(self._output_args_speaker)
+        self._restart_outputs(True, True)
 
     def _output_device_speaker_change(self, info: Optional[DeviceInfo]):
         if info is None:
@@ -165,38 +268,76 @@ class AudioHandler:
         logger.debug(f"AudioHandler > output device (speaker) change: {info}")
         self._output_args_speaker.device_index = info.index
         self._output_args_speaker.channel = min(max(info.maxOutputChannels // 2, default_channels), max_stream_channels)
-        self._output_args_speaker.sample_rate = int(info.defaultSampleRate)
-        self._output_args_speaker.frame_size = int(
-            default_frame_size * self._output_args_speaker.sample_rate / opus_default_sample_rate
-        ) * self._output_args_speaker.channel
-        self._decoder_speaker.update(self._output_args_speaker)
-        if self._mixed_output_speaker.active:
+        self._output_args_speaker.sample_rate = self._preferred_sample_rate(
+            info, self._output_args_speaker.channel, False
+        )
+        self._output_args_speaker.frame_size = self._device_frame_size(self._output_args_speaker)
+        self._mixed_output_speaker.update_decoder_pool(self._output_args_speaker)
+        self._restart_outputs(False, True)
+
+    def _set_shared_output(self, shared: bool) -> None:
+        """合并时把扬声器一路的 transmitter 并入耳机一路，拆分时再从耳机一路移除。"""
+        self._shared_output = shared
+        for transmitter_id in self._mixed_output_speaker.transmitters:
+            if shared:
+                self._mixed_output_headphone.add_transmitter(transmitter_id)
+            else:
+                self._mixed_output_headphone.remove_transmitter(transmitter_id)
+        logger.debug(f"AudioHandler > headphone and speaker {'share one' if shared else 'use separate'} output stream")
+
+    def _restart_outputs(self, headphone: bool, speaker: bool) -> None:
+        """
+        输出设备变化后按需重启两路混合输出；耳机与扬声器变为同一设备（或不再是同一设备）时先合并（或拆分），
+        合并后扬声器一路不再打开。未开始会话时只更新合并状态，由 start 按其打开。
+        """
+        shared = self._output_args.device_index == self._output_args_speaker.device_index
+        if shared != self._shared_output:
+            self._set_shared_output(shared)
+            speaker = True
+        if not self._mixed_output_headphone.active:
+            return
+        if headphone:
+            self._mixed_output_headphone.restart(self._output_args)
+        if shared:
+            self._mixed_output_speaker.stop()
+        elif speaker:
             self._mixed_output_speaker.restart(self._output_args_speaker)
 
     def _stream_for_target(self, output_target: OutputTarget) -> MixedOutputAudioStream:
-        """按输出目标返回对应混合流。"""
-        return self._mixed_output_headphone if output_target == OutputTarget.Headphone else self._mixed_output_speaker
+        """按输出目标返回实际播放的混合流，耳机与扬声器是同一设备时均为耳机一路。"""
+        if output_target == OutputTarget.Headphone or self._shared_output:
+            return self._mixed_output_headphone
+        return self._mixed_output_speaker
 
     def _stream_for_play_device(self, device: str) -> MixedOutputAudioStream:
         """按配置项「播放设备」返回混合流，device 为 耳机 或 扬声器。"""
-        return self._mixed_output_speaker if device == "扬声器" else self._mixed_output_headphone
+        return self._stream_for_target(OutputTarget.Speaker if device == "扬声器" else OutputTarget.Headphone)
+
+    def _register_transmitter(self, transmitter_id: int, output_target: OutputTarget) -> None:
+        """登记到输出目标所属的一路；合并输出时同时登记到实际播放的耳机一路。"""
+        stream = self._mixed_output_headphone if output_target == OutputTarget.Headphone else self._mixed_output_speaker
+        stream.add_transmitter(transmitter_id)
+        self._stream_for_target(output_target).add_transmitter(transmitter_id)
+
+    def _unregister_transmitter(self, transmitter_id: int, output_target: OutputTarget) -> None:
+        stream = self._mixed_output_headphone if output_target == OutputTarget.Headphone else self._mixed_output_speaker
+        stream.remove_transmitter(transmitter_id)
+        self._stream_for_target(output_target).remove_transmitter(transmitter_id)
 
     def add_transmitter(self, transmitter: Transmitter):
-        stream = self._stream_for_target(transmitter.output_target)
-        stream.add_transmitter(transmitter.id)
+        self._register_transmitter(transmitter.id, transmitter.output_target)
         logger.debug(f"AudioHandler > transmitter added: {transmitter}")
 
     def set_transmitter_output_target(self, transmitter: Transmitter) -> None:
         """将 transmitter 从当前输出切到另一路（耳机/扬声器）。"""
-        old_stream = self._stream_for_target(
+        self._unregister_transmitter(
+            transmitter.id,
             OutputTarget.Speaker if transmitter.output_target == OutputTarget.Headphone else OutputTarget.Headphone
         )
-        new_stream = self._stream_for_target(transmitter.output_target)
-        old_stream.remove_transmitter(transmitter.id)
-        new_stream.add_transmitter(transmitter.id)
+        self._register_transmitter(transmitter.id, transmitter.output_target)
         logger.debug(f"AudioHandler > transmitter {transmitter.id} switched to {transmitter.output_target}")
 
-    def play_encoded_audio(self, transmitter: Transmitter, encoded_data: bytes, conflict: bool = False):
+    def play_encoded_audio(self, transmitter: Transmitter, packet: VoicePacket, conflict: bool = False):
         if transmitter.volume == 0 or not transmitter.receive_flag:
             return
         volume = self._conflict_volume if conflict else transmitter.volume
@@ -207,15 +348,84 @@ class AudioHandler:
         )
         logger.trace(f"AudioHandler > frequency {transmitter.frequency} play on {transmitter.output_target}")
         stream.play_encoded_audio(
-            transmitter.id, encoded_data, conflict, volume
+            transmitter.id, (packet.cid, packet.transmitter), packet.data, conflict, volume
         )
 
+    @staticmethod
+    def _device_diagnostics(args: SteamArgs) -> dict[str, int | bool]:
+        return {"sample_rate": args.sample_rate, "resampling": args.sample_rate != opus_default_sample_rate}
+
+    def diagnostics(self) -> dict[str, dict]:
+        """
+        运行时诊断信息，会话期间定时写入调试日志：
+        各设备的采样率及是否重采样，扬声器是否与耳机合并为一路；
+        各路解码器池的命中、未命中与淘汰计数，各发送方抖动缓冲的深度与迟到、丢弃统计；
+        丢包补偿次数与解码耗时，积压超限的追赶次数；
+        编码器档位，自适应码率的当前参数与链路状态，采集溢出与编码延迟。
+        """
+        return {
+            "device": {
+                "input": self._device_diagnostics(self._input_args),
+                "headphone": self._device_diagnostics(self._output_args),
+                "speaker": {**self._device_diagnostics(self._output_args_speaker), "shared": self._shared_output},
+            },
+            "decoder_pool": {
+                "headphone": self._decoder_pool_headphone.stats,
+                "speaker": self._decoder_pool_speaker.stats,
+            },
+            "jitter_buffer": {
+                "headphone": self._mixed_output_headphone.jitter_stats,
+                "speaker": self._mixed_output_speaker.jitter_stats,
+            },
+            "concealment": {
+                "headphone": self._mixed_output_headphone.concealment_stats,
+                "speaker": self._mixed_output_speaker.concealment_stats,
+            },
+            "decode": {
+                "headphone": self._mixed_output_headphone.decode_stats,
+                "speaker": self._mixed_output_speaker.decode_stats,
+            },
+            "catch_up": {
+                "headphone": self._mixed_output_headphone.catch_up_stats,
+                "speaker": self._mixed_output_speaker.catch_up_stats,
+            },
+            "encoder": asdict(self._encoder.profile),
+            "bitrate": self._bitrate_controller.stats,
+            "capture": self._input_stream.capture_stats,
+        }
+
+    def _log_diagnostics(self) -> None:
+        logger.debug(f"AudioHandler > diagnostics: {self.diagnostics()}")
+
     def start(self):
+        # 发送帧时长在每次会话开始时按配置确定；接收端按包的 TOC 识别各发送方的帧时长，无需与服务器协商
+        self._apply_frame_time(config.audio.frame_time)
+        self._apply_encoder_profile(config.audio.encoder_profile)
         self._input_stream.start(self._input_args)
         self._mixed_output_headphone.start(self._output_args)
-        self._mixed_output_speaker.start(self._output_args_speaker)
+        if not self._shared_output:
+            self._mixed_output_speaker.start(self._output_args_speaker)
+        self._decode_worker.start()
+        self._start_bitrate_adaptation()
+        self._diagnostics_timer.start()
+
+    def _start_bitrate_adaptation(self) -> None:
+        audio = config.audio
+        if not audio.adaptive_bitrate:
+            self._encoder.apply_settings(None)
+            return
+        self._bitrate_controller.reset(audio.min_bitrate, audio.max_bitrate, audio.opus_expected_loss)
+        self._link_counters = self._link_stats()
+        self._encoder.apply_settings(self._bitrate_controller.settings)
+        self._bitrate_timer.start()
 
     def cleanup(self):
+        if self._diagnostics_timer.isActive():
+            self._diagnostics_timer.stop()
+            # 会话结束时再输出一次本次会话的累计统计
+            self._log_diagnostics()
+        self._bitrate_timer.stop()
+        self._decode_worker.stop()
         self._input_stream.stop()
         self._mixed_output_headphone.stop()
         self._mixed_output_speaker.stop()
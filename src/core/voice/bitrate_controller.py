@@ -0,0 +1,150 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""自适应码率：按链路往返时延与接收丢包率调整 Opus 编码码率、最大带宽与 FEC 冗余强度。"""
+from dataclasses import dataclass
+from math import ceil
+from typing import Optional
+
+from opuslib import (  # type: ignore
+    BANDWIDTH_FULLBAND, BANDWIDTH_MEDIUMBAND, BANDWIDTH_NARROWBAND, BANDWIDTH_SUPERWIDEBAND, BANDWIDTH_WIDEBAND
+)
+
+from src.constants import bitrate_decrease_factor, bitrate_increase_hold, bitrate_increase_step, \
+    bitrate_loss_high, bitrate_loss_low, bitrate_min_loss_samples, bitrate_rtt_high, bitrate_rtt_low, \
+    opus_default_bitrate, opus_max_expected_loss
+
+# 码率下限（bps）与该码率下允许的最大带宽，码率越低带宽越窄，把有限的比特留给语音主要频段
+_bandwidth_steps: tuple[tuple[int, int], ...] = (
+    (24000, BANDWIDTH_FULLBAND),
+    (16000, BANDWIDTH_SUPERWIDEBAND),
+    (12000, BANDWIDTH_WIDEBAND),
+    (9000, BANDWIDTH_MEDIUMBAND),
+    (0, BANDWIDTH_NARROWBAND),
+)
+
+
+def bandwidth_for_bitrate(bitrate: int) -> int:
+    for threshold, bandwidth in _bandwidth_steps:
+        if bitrate >= threshold:
+            return bandwidth
+    return BANDWIDTH_NARROWBAND
+
+
+@dataclass(frozen=True)
+class EncoderSettings:
+    """一组随链路调整的编码参数：码率（bps）、最大带宽（opuslib BANDWIDTH_*）与 FEC 预期丢包率（%）。"""
+    bitrate: int
+    bandwidth: int
+    expected_loss: int
+
+
+class BitrateController:
+    """
+    码率控制器，由主线程定时调用 evaluate，结果交给编码器在下一次编码前生效。
+
+    - 丢包率或 RTT 超过上限门限时立即按 bitrate_decrease_factor 降低码率（快降）；
+    - 两者都低于下限门限且连续 bitrate_increase_hold 次评估都如此时才按 bitrate_increase_step 升高码率（慢升）；
+    - 上下限门限之间保持不变，避免在门限附近来回切换；
+    - FEC 预期丢包率取配置值与实测丢包率中的较大者，实测值不超过 opus_max_expected_loss。
+    最近一段时间内接收帧数太少时丢包率不可信，只按 RTT 判断。
+    PING 的间隔远大于评估间隔，每个 RTT 样本只在其后的第一次评估中触发降码率，一个样本至多降一档；
+    升码率则要求最近一次测得的 RTT 低于下限，且本轮连续达标期间收到过新的 RTT 样本，
+    尚未测得 RTT 或链路空闲时不会凭空升到上限。
+    """
+
+    def __init__(self, min_bitrate: int = opus_default_bitrate, max_bitrate: int = opus_default_bitrate,
+                 expected_loss: int = 0):
+        self._min_bitrate = min_bitrate
+        self._max_bitrate = max_bitrate
+        self._base_loss = expected_loss
+        self._rtt: Optional[float] = None  # 最近一次测得的 RTT
+        self._rtt_fresh = False  # 最近一次测得的 RTT 尚未参与评估
+        self._loss = 0.0  # 平滑后的接收丢包率
+        self._good_rounds = 0  # 连续满足升码率条件的评估次数
+        self._rtt_confirmed = False  # 本轮连续达标期间收到过新的 RTT 样本
+        self._decreases = 0
+        self._increases = 0
+        self._settings = EncoderSettings(opus_default_bitrate, BANDWIDTH_FULLBAND, expected_loss)
+        self.reset(min_bitrate, max_bitrate, expected_loss)
+
+    @property
+    def settings(self) -> EncoderSettings:
+        return self._settings
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "bitrate": self._settings.bitrate,
+            "bandwidth": self._settings.bandwidth,
+            "expected_loss": self._settings.expected_loss,
+            "rtt_ms": round(self._rtt * 1000, 1) if self._rtt is not None else -1,
+            "loss": round(self._loss, 4),
+            "decreases": self._decreases,
+            "increases": self._increases,
+        }
+
+    def _make_settings(self, bitrate: int, expected_loss: int) -> EncoderSettings:
+        bitrate = min(max(bitrate, self._min_bitrate), self._max_bitrate)
+        return EncoderSettings(bitrate, bandwidth_for_bitrate(bitrate), expected_loss)
+
+    def reset(self, min_bitrate: int, max_bitrate: int, expected_loss: int) -> None:
+        """按配置重新设置上下限，码率回到默认码率（限制在上下限内）。"""
+        self._min_bitrate = min(min_bitrate, max_bitrate)
+        self._max_bitrate = max_bitrate
+        self._base_loss = min(max(expected_loss, 0), 100)
+        self._rtt = None
+        self._rtt_fresh = False
+        self._loss = 0.0
+        self._good_rounds = 0
+        self._rtt_confirmed = False
+        self._settings = self._make_settings(opus_default_bitrate, self._base_loss)
+
+    def report_rtt(self, rtt: float) -> None:
+        """记录一次 PING/PONG 测得的往返时延（秒）。"""
+        self._rtt = rtt
+        self._rtt_fresh = True
+
+    def evaluate(self, received: int, lost: int) -> Optional[EncoderSettings]:
+        """
+        按上次评估以来的接收帧数与丢失帧数评估链路，编码参数需要改变时返回新参数，否则返回 None。
+        """
+        total = received + lost
+        loss_known = total >= bitrate_min_loss_samples
+        if loss_known:
+            self._loss += (lost / total - self._loss) / 2
+        rtt, rtt_fresh = self._rtt, self._rtt_fresh
+        rtt_high = rtt_fresh and rtt is not None and rtt >= bitrate_rtt_high
+        self._rtt_fresh = False
+
+        bitrate = self._settings.bitrate
+        congested = (loss_known and self._loss >= bitrate_loss_high) or rtt_high
+        clear = (not loss_known or self._loss <= bitrate_loss_low) and rtt is not None and rtt <= bitrate_rtt_low
+        if congested:
+            self._good_rounds = 0
+            self._rtt_confirmed = False
+            bitrate = int(bitrate * bitrate_decrease_factor)
+        elif clear:
+            self._good_rounds += 1
+            self._rtt_confirmed |= rtt_fresh
+            # 连续达标次数已够但尚无新的 RTT 样本时保持计数，等下一个样本到达再升
+            if self._good_rounds >= bitrate_increase_hold and self._rtt_confirmed:
+                self._good_rounds = 0
+                self._rtt_confirmed = False
+                bitrate += bitrate_increase_step
+        else:
+            self._good_rounds = 0
+            self._rtt_confirmed = False
+
+        expected_loss = self._base_loss
+        if loss_known:
+            # 只限制实测丢包率一项，配置的预期丢包率照常生效
+            expected_loss = max(expected_loss, min(ceil(self._loss * 100), opus_max_expected_loss))
+        settings = self._make_settings(bitrate, expected_loss)
+        if settings == self._settings:
+            return None
+        if settings.bitrate < self._settings.bitrate:
+            self._decreases += 1
+        elif settings.bitrate > self._settings.bitrate:
+            self._increases += 1
+        self._settings = settings
+        return settings
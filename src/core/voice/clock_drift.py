@@ -0,0 +1,97 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""时钟漂移补偿：按接收缓冲的填充水平估计发送方与本机播放时钟的漂移，以 ±1 样本的微量重采样修正。"""
+from numpy import arange, empty, float32, interp, linspace
+from numpy.typing import NDArray
+
+from src.constants import drift_deadband, drift_settle_updates, drift_smoothing
+
+
+def stretch_frame(frame: NDArray[float32], frame_count: int) -> NDArray[float32]:
+    """将 (帧数, 声道数) 的一帧线性插值为 frame_count 帧，首尾样本不变，与前后帧保持连续。"""
+    n, channels = frame.shape
+    positions = linspace(0, n - 1, frame_count)
+    source = arange(n)
+    out = empty((frame_count, channels), dtype=float32)
+    for channel in range(channels):
+        out[:, channel] = interp(positions, source, frame[:, channel])
+    return out
+
+
+class DriftCompensator:
+    """
+    单个发送方的漂移补偿器，在解码线程中使用。
+
+    发送方的采样时钟与本机播放时钟存在微小偏差时，持续发射期间接收缓冲会缓慢增长（延迟变大）或耗尽（断续）。
+    每次解码前以 update 报告该发送方缓冲的音频时长：开始播放后先以一段时间内的平均值作为基准，
+    此后平滑后的水平偏离基准超出死区时开始修正，直到回到基准为止：期间 apply 把每帧解码出的音频
+    少播一个样本（追赶）或多播一个样本（等待）。修正回到基准而不是停在死区边缘，接收时机不会因此逐渐偏移。
+    每帧至多修正一个样本（20ms 帧约 0.1%），远大于声卡晶振的典型偏差，且人耳无法察觉。
+    """
+
+    def __init__(self, deadband: float = drift_deadband, smoothing: float = drift_smoothing,
+                 settle_updates: int = drift_settle_updates):
+        self._deadband = deadband
+        self._smoothing = smoothing
+        self._settle_updates = settle_updates
+        self._updates = 0
+        self._baseline = 0.0  # 开始播放后缓冲时长的平均值（秒）
+        self._level = 0.0  # 平滑后的缓冲时长（秒）
+        self._correction = 0  # 正在进行的修正方向：-1 追赶，+1 等待，0 不修正
+        self._adjustment = 0  # 下一帧应增减的样本数
+        self._dropped = 0
+        self._inserted = 0
+
+    @property
+    def dropped(self) -> int:
+        """为追赶而少播的样本数。"""
+        return self._dropped
+
+    @property
+    def inserted(self) -> int:
+        """为等待而多播的样本数。"""
+        return self._inserted
+
+    @property
+    def error(self) -> float:
+        """平滑后的缓冲时长相对基准的偏差（秒）。"""
+        return self._level - self._baseline
+
+    def reset(self) -> None:
+        """发送方停止或重新缓冲时调用，下次开始播放时重新建立基准。"""
+        self._updates = 0
+        self._baseline = 0.0
+        self._level = 0.0
+        self._correction = 0
+        self._adjustment = 0
+
+    def update(self, buffered: float) -> None:
+        """报告当前缓冲的音频时长（秒），决定下一帧的修正。"""
+        if self._updates < self._settle_updates:
+            self._updates += 1
+            self._baseline += (buffered - self._baseline) / self._updates
+            self._level = self._baseline
+            return
+        self._level += (buffered - self._level) * self._smoothing
+        error = self._level - self._baseline
+        if self._correction == 0:
+            if error > self._deadband:
+                self._correction = -1
+            elif error < -self._deadband:
+                self._correction = 1
+        elif error * self._correction >= 0:
+            # 已回到基准
+            self._correction = 0
+        self._adjustment = self._correction
+
+    def apply(self, frame: NDArray[float32]) -> NDArray[float32]:
+        """按当前修正伸缩 (帧数, 声道数) 的一帧，无需修正时原样返回。"""
+        adjustment = self._adjustment
+        if adjustment == 0 or frame.shape[0] < 2:
+            return frame
+        self._adjustment = 0
+        if adjustment < 0:
+            self._dropped += 1
+        else:
+            self._inserted += 1
+        return stretch_frame(frame, frame.shape[0] + adjustment)
@@ -0,0 +1,62 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""解码线程：在独立线程中为各混合输出流提前解码，播放回调只负责混音。"""
+from threading import Event, Thread
+from typing import Callable, Optional
+
+from loguru import logger
+
+from src.constants import default_frame_time_s
+
+
+class DecodeWorker:
+    """
+    按需解码：播放回调消耗数据后唤醒本线程，由各流的 decode_pending 从抖动缓冲取帧解码到发送方的 PCM 缓冲；
+    未被唤醒时每半帧轮询一次，保证新发送方开始发送时能及时解码。
+    """
+
+    def __init__(self):
+        self._sources: list[Callable[[], None]] = []
+        self._wakeup = Event()
+        self._running = False
+        self._thread: Optional[Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def add_source(self, source: Callable[[], None]) -> None:
+        """登记一个解码任务（如混合输出流的 decode_pending），每轮依次调用。"""
+        self._sources.append(source)
+
+    def wake(self) -> None:
+        """请求解码线程尽快运行一轮，可在任意线程调用。"""
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while self._running:
+            self._wakeup.wait(default_frame_time_s / 2)
+            self._wakeup.clear()
+            for source in self._sources:
+                try:
+                    source()
+                except Exception as e:
+                    logger.error(f"DecodeWorker > decode error: {e}")
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = Thread(target=self._run, name="DecodeWorker", daemon=True)
+        self._thread.start()
+        logger.debug("DecodeWorker > decode worker started")
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        logger.debug("DecodeWorker > decode worker stopped")
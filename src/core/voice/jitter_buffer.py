@@ -0,0 +1,256 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""自适应抖动缓冲：按发送方缓存 Opus 包，依据到达间隔抖动调整播放延迟，检测丢包与迟到包。"""
+from collections import deque
+from enum import Enum
+from math import ceil
+from time import monotonic
+from typing import Optional
+
+from src.constants import default_frame_time_s, jitter_buffer_max_conceal, jitter_buffer_max_depth, \
+    jitter_buffer_min_depth, jitter_buffer_spurt_timeout, opus_default_sample_rate, opus_dtx_keepalive_frames
+from .opus import is_dtx_packet, packet_frame_size
+
+
+class FrameStatus(Enum):
+    AUDIO = 0  # 正常的一帧
+    LOST = 1  # 该帧丢失，需要补偿
+    SILENCE = 2  # 没有可播放的数据（缓冲中或发送方已停止发送）
+    COMFORT = 3  # 发送方处于 DTX 静音期，由解码器的丢包补偿填补空档
+
+
+class JitterBuffer:
+    """
+    单个发送方的抖动缓冲，put 在收包线程调用，get 在播放端按 Opus 帧节奏调用。
+
+    语音包不带序号，帧序号按到达顺序依次递增，并结合到达时间修正：
+    - 到达间隔超出抖动范围时视为中间丢包，写入丢包占位；若随后的包紧接着突发到达，
+      说明只是一次延迟尖峰，尚未播放的占位会被撤回；
+    - 播放端已越过某帧的播放时刻（已为其做过补偿）后才到达的包视为迟到包并丢弃；
+    - 收到 DTX 包后发送方进入静音期，直到下一个正常包之前的空档由解码器的丢包补偿填补，不计为丢包。
+    目标深度按平滑后的到达间隔抖动自适应调整，在每段发射开始缓冲时生效。
+    帧时长取自包的 TOC 字节，发送方更换帧时长后自动跟随。
+    """
+
+    def __init__(self, frame_time: float = default_frame_time_s,
+                 min_depth: int = jitter_buffer_min_depth,
+                 max_depth: int = jitter_buffer_max_depth,
+                 spurt_timeout: float = jitter_buffer_spurt_timeout):
+        self._min_depth = min_depth
+        self._max_depth = max_depth
+        self._spurt_timeout = spurt_timeout
+        self._comfort_timeout = 0.0
+        self._set_frame_time(frame_time)
+        self._queue: deque[Optional[bytes]] = deque()
+        self._playing = False
+        self._spurt_start = 0.0
+        self._play_start = 0.0
+        self._last_arrival = 0.0
+        self._jitter = 0.0  # 平滑后的到达间隔偏差（秒）
+        self._target = min_depth
+        self._write_index = 0  # 下一个写入帧的序号
+        self._read_index = 0  # 下一个播放帧的序号
+        self._pending_gap: list[int] = []  # 最近一次写入的丢包占位序号，突发到达时可撤回
+        self._concealed = 0  # 缓冲为空时连续补偿的帧数
+        self._dtx = False  # 发送方处于 DTX 静音期
+        self._dtx_packets = 0
+        self._received = 0
+        self._lost = 0
+        self._late = 0
+        self._discarded = 0
+        self._underruns = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def target_depth(self) -> int:
+        return self._target
+
+    @property
+    def frame_time(self) -> float:
+        return self._frame_time
+
+    @property
+    def playing(self) -> bool:
+        """已缓冲到目标深度并按播放节奏出帧。"""
+        return self._playing
+
+    @property
+    def dtx(self) -> bool:
+        """发送方处于 DTX 静音期。"""
+        return self._dtx
+
+    @property
+    def last_arrival(self) -> float:
+        return self._last_arrival
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "depth": len(self._queue),
+            "target": self._target,
+            "jitter_ms": round(self._jitter * 1000, 2),
+            "received": self._received,
+            "lost": self._lost,
+            "late": self._late,
+            "discarded": self._discarded,
+            "underruns": self._underruns,
+            "dtx": self._dtx_packets,
+        }
+
+    def _set_frame_time(self, frame_time: float) -> None:
+        self._frame_time = frame_time
+        # DTX 静音期间发送方每隔 opus_dtx_keepalive_frames 帧发送一个 DTX 包
+        self._comfort_timeout = opus_dtx_keepalive_frames * frame_time + self._spurt_timeout
+
+    def _update_target(self) -> None:
+        target = 1 + ceil(3 * self._jitter / self._frame_time)
+        self._target = min(max(target, self._min_depth), self._max_depth)
+
+    def _start_spurt(self, now: float) -> None:
+        self._queue.clear()
+        self._pending_gap.clear()
+        self._playing = False
+        self._spurt_start = now
+        self._write_index = 0
+        self._read_index = 0
+
+    def _revoke_gap(self) -> None:
+        """撤回最近一次尚未播放的丢包占位（从最后一个开始）。"""
+        index = self._pending_gap.pop()
+        position = index - self._read_index
+        if position < 0 or self._queue[position] is not None:
+            self._pending_gap.clear()
+            return
+        del self._queue[position]
+        self._write_index -= 1
+        self._lost -= 1
+
+    def put(self, payload: bytes, now: Optional[float] = None) -> None:
+        now = monotonic() if now is None else now
+        if is_dtx_packet(payload):
+            # 静音期的 DTX 包不入队，只用于维持发送方的活跃状态
+            self._dtx = True
+            self._dtx_packets += 1
+            self._pending_gap.clear()
+            self._last_arrival = now
+            return
+        frame_size = packet_frame_size(payload)
+        if frame_size > 0 and frame_size != round(self._frame_time * opus_default_sample_rate):
+            self._set_frame_time(frame_size / opus_default_sample_rate)
+            self._update_target()
+        missing = 0
+        if self._last_arrival == 0.0 or now - self._last_arrival > self._spurt_timeout or \
+                (self._dtx and not self._queue):
+            # 新的一段发射（或 DTX 静音期后恢复发送）：清空残留并重新缓冲
+            self._start_spurt(now)
+        elif self._dtx:
+            # 静音期很短，缓冲中的帧尚未播完，直接接在其后
+            pass
+        else:
+            delta = now - self._last_arrival
+            # RFC 3550 的到达间隔抖动估计
+            self._jitter += (abs(delta - self._frame_time) - self._jitter) / 16
+            self._update_target()
+            if delta < self._frame_time / 2 and self._pending_gap:
+                # 上次的间隔其实是延迟尖峰，后续包正在突发到达
+                self._revoke_gap()
+            else:
+                self._pending_gap.clear()
+                missing = max(round((delta - 2 * self._jitter) / self._frame_time) - 1, 0)
+        self._dtx = False
+        self._last_arrival = now
+        self._received += 1
+        self._concealed = 0
+
+        index = self._write_index + missing
+        if index < self._read_index:
+            if now > self._play_start + index * self._frame_time:
+                # 该帧的播放时刻已过
+                self._late += 1
+                self._write_index = index + 1
+                return
+            # 未到播放时刻播放端却已越过该序号，说明此前有未察觉的丢包，顺延序号
+            self._lost += self._read_index - index
+            index = self._read_index
+        gap = index - max(self._write_index, self._read_index)
+        if gap > 0:
+            self._lost += gap
+            self._queue.extend([None] * gap)
+            self._pending_gap = list(range(index - gap, index))
+        self._queue.append(payload)
+        self._write_index = index + 1
+
+        # 突发到达超过上限时丢弃最旧的帧，限制播放延迟
+        if len(self._queue) > self._max_depth:
+            self._discard(len(self._queue) - self._max_depth)
+
+    def get(self, now: Optional[float] = None) -> tuple[FrameStatus, Optional[bytes]]:
+        now = monotonic() if now is None else now
+        if not self._playing:
+            if not self._queue:
+                return FrameStatus.SILENCE, None
+            # 缓冲达到目标深度，或发射太短迟迟达不到目标深度时开始播放
+            if len(self._queue) < self._target and now - self._spurt_start < self._target * self._frame_time:
+                return FrameStatus.SILENCE, None
+            self._playing = True
+            self._play_start = now - self._read_index * self._frame_time
+        if self._queue:
+            if len(self._queue) > 2 * self._target + 1:
+                # 深度远超目标（如突发到达后），丢弃最旧的一帧追赶
+                self._discard(1)
+            self._read_index += 1
+            payload = self._queue.popleft()
+            if payload is None:
+                return FrameStatus.LOST, None
+            return FrameStatus.AUDIO, payload
+        if self._dtx:
+            if now - self._last_arrival > self._comfort_timeout:
+                # 连续多个 DTX 包都未收到，视为发送方已停止发送
+                self._playing = False
+                return FrameStatus.SILENCE, None
+            return FrameStatus.COMFORT, None
+        if now - self._last_arrival > self._spurt_timeout:
+            # 发送方已停止发送，结尾处的补偿并非真正的欠载
+            self._playing = False
+            self._underruns -= min(self._concealed, jitter_buffer_max_conceal)
+            self._concealed = 0
+            return FrameStatus.SILENCE, None
+        self._read_index += 1
+        self._concealed += 1
+        if self._concealed > jitter_buffer_max_conceal:
+            # 连续补偿过多帧已无意义，保持时间轴推进但输出静音
+            return FrameStatus.SILENCE, None
+        self._underruns += 1
+        return FrameStatus.LOST, None
+
+    def peek(self) -> Optional[bytes]:
+        """查看下一帧的数据但不取出；下一帧为丢包占位或缓冲为空时返回 None。"""
+        return self._queue[0] if self._queue else None
+
+    def drop_oldest(self, keep: int) -> int:
+        """丢弃最旧的帧直到只剩 keep 帧，之后各帧的播放时刻随之提前；返回丢弃的帧数，计入 discarded。"""
+        count = max(len(self._queue) - keep, 0)
+        self._discard(count)
+        return count
+
+    def _discard(self, count: int) -> None:
+        """
+        丢弃最旧的 count 帧：读序号前移的同时播放时刻基准提前同样的时长，缓冲中剩余的帧随之提前播放，
+        迟到判定按实际的播放进度进行。
+        """
+        for _ in range(count):
+            self._queue.popleft()
+        self._read_index += count
+        self._discarded += count
+        self._play_start -= count * self._frame_time
+
+    def shift_schedule(self, offset: float) -> None:
+        """播放端多播（正）或少播（负）了 offset 秒的音频，后续帧的播放时刻随之顺延或提前。"""
+        self._play_start += offset
+
+    def expired(self, now: float, timeout: float) -> bool:
+        """超过 timeout 未收到数据且已播放完毕。"""
+        return not self._queue and now - self._last_arrival > timeout
@@ -2,10 +2,10 @@
 #  SPDX-License-Identifier: MIT
 """语音网络层：TCP 信令（连接、SWITCH、PING/PONG 等）+ UDP 语音包收发。"""
 from socket import AF_INET, SOCK_DGRAM, SOCK_STREAM, socket
-from struct import unpack
+from struct import Struct
 from threading import Thread
-from time import time
-from typing import Optional
+from time import monotonic, time
+from typing import Callable, Optional
 
 from PySide6.QtCore import QObject, QTimer
 from loguru import logger
@@ -15,8 +15,15 @@ from src.model import ClientInfo, ControlMessage, MessageType, VoicePacket, Voic
 from src.signal import AudioClientSignals
 
 
+# 语音包头：cid(int32) + transmitter(int8) + frequency(int32) + 呼号长度(uint8)
+_voice_header = Struct("<ibiB")
+
+
 class NetworkHandler(QObject):
-    """TCP 信令 + UDP 语音：连接后发 JWT，TCP 按行解析 ControlMessage，UDP 解析 VoicePacket 并 emit。"""
+    """
+    TCP 信令 + UDP 语音：连接后发 JWT，TCP 按行解析 ControlMessage；
+    UDP 解析 VoicePacket 后在收包线程直接交给 voice_packet_handler，不经过 Qt 信号。
+    """
 
     def __init__(self, signals: AudioClientSignals, client_info: ClientInfo):
         super().__init__()
@@ -32,6 +39,9 @@ class NetworkHandler(QObject):
         self._tcp_running = False
         self._udp_running = False
         self._connected = False
+        self._voice_packet_handler: Optional[Callable[[VoicePacket], None]] = None
+        self._ping_time = 0.0  # 最近一次未收到 PONG 的 PING 发送时刻（monotonic），0 表示没有
+        self._rtt: Optional[float] = None
 
         self._heartbeat_timer = QTimer()
         self._heartbeat_timer.timeout.connect(self._heartbeat_send_handler)
@@ -40,6 +50,28 @@ class NetworkHandler(QObject):
         self._empty_voice_packet = VoicePacketBuilder.build_packet(client_info.cid, 0, 0,
                                                                    client_info.callsign, b"")
 
+    @property
+    def voice_packet_handler(self) -> Optional[Callable[[VoicePacket], None]]:
+        return self._voice_packet_handler
+
+    @voice_packet_handler.setter
+    def voice_packet_handler(self, handler: Callable[[VoicePacket], None]):
+        """收到语音包时在 UDP 收包线程调用，处理函数需线程安全且不能阻塞。"""
+        self._voice_packet_handler = handler
+
+    @property
+    def rtt(self) -> Optional[float]:
+        """最近一次 PING/PONG 测得的 TCP 信令往返时延（秒），尚未测得时为 None。"""
+        return self._rtt
+
+    def pong_received(self) -> Optional[float]:
+        """收到 PONG 时调用，按对应 PING 的发送时刻计算往返时延；没有等待中的 PING 时返回 None。"""
+        if self._ping_time == 0.0:
+            return None
+        self._rtt = monotonic() - self._ping_time
+        self._ping_time = 0.0
+        return self._rtt
+
     def _show_log_message(self, level: str, message: str):
         self._signals.show_log_message.emit("Network", level, message)
 
@@ -48,6 +80,7 @@ class NetworkHandler(QObject):
             return
         message = ControlMessage(type=MessageType.PING, cid=self._client_info.cid,
                                  callsign=self._client_info.callsign, data=str(int(time())))
+        self._ping_time = monotonic()
         self.send_control_message(message)
         self.send_voice_packet(self._empty_voice_packet)
 
@@ -163,12 +196,10 @@ class NetworkHandler(QObject):
     # 处理音频数据
     def _process_voice_packet(self, data: bytes):
         try:
-            if len(data) < 10 or data[-1] != 0x0A:
+            handler = self._voice_packet_handler
+            if handler is None or len(data) < 10 or data[-1] != 0x0A:
                 return
-            cid = unpack('<i', data[0:4])[0]
-            transmitter = unpack('<b', data[4:5])[0]
-            frequency = unpack('<i', data[5:9])[0]
-            callsign_len = data[9]
+            cid, transmitter, frequency, callsign_len = _voice_header.unpack_from(data)
             if 9 + callsign_len > len(data) - 1:
                 return
             callsign = data[10:10 + callsign_len].decode("utf-8")
@@ -176,8 +207,7 @@ class NetworkHandler(QObject):
             logger.trace(
                 f"NetworkHandler > received from {callsign} (CID={cid}, Freq={frequency}), {len(audio_data)} bytes"
             )
-            packet = VoicePacket(cid, transmitter, frequency, callsign, audio_data)
-            self._signals.voice_data_received.emit(packet)
+            handler(VoicePacket(cid, transmitter, frequency, callsign, audio_data))
         except Exception as e:
             logger.error(f"NetworkHandler > failed to process voice packet: {e}")
 
@@ -185,6 +215,8 @@ class NetworkHandler(QObject):
         self._tcp_running = False
         self._udp_running = False
         self._connected = False
+        self._ping_time = 0.0
+        self._rtt = None
 
         self._heartbeat_timer.stop()
 
@@ -1,77 +1,436 @@
 #  Copyright (c) 2025-2026 Half_nothing
 #  SPDX-License-Identifier: MIT
-"""Opus 编解码与流参数：SteamArgs、OpusDecoder、OpusEncoder。"""
+"""Opus 编解码与流参数：SteamArgs、OpusDecoder、OpusDecoderPool、EncoderProfile、OpusEncoder。"""
 
-from dataclasses import dataclass
+from collections import OrderedDict
+from ctypes import c_char, string_at
+from dataclasses import dataclass, replace
+from time import monotonic
 from typing import Optional
 
 from loguru import logger
-from numpy import float32, frombuffer, int16, ndarray
-from opuslib import APPLICATION_VOIP, Decoder, Encoder  # type: ignore
+from numpy import ascontiguousarray, dot, float32, int16, log10, ndarray, zeros
+from numpy.typing import NDArray
+from opuslib import (  # type: ignore
+    APPLICATION_AUDIO, APPLICATION_VOIP, AUTO, BANDWIDTH_FULLBAND, BANDWIDTH_SUPERWIDEBAND, BANDWIDTH_WIDEBAND,
+    Decoder, Encoder, OpusError, SIGNAL_VOICE
+)
+from opuslib.api import c_float_pointer, ctl as opus_ctl  # type: ignore
+from opuslib.api.decoder import libopus_decode_float  # type: ignore
+from opuslib.api.encoder import encoder_ctl, libopus_encode_float  # type: ignore
 
-from src.constants import default_frame_size, opus_default_bitrate, opus_default_sample_rate
+from src.config import config
+from src.constants import default_frame_size, default_frame_time, opus_decoder_idle_timeout, \
+    opus_decoder_pool_capacity, opus_default_bitrate, opus_default_sample_rate, opus_dtx_keepalive_frames, \
+    opus_frame_times, opus_max_frame_size, opus_max_packet_size, vad_hangover_frames
+from .bitrate_controller import EncoderSettings
+
+# 发送方标识：(cid, transmitter)
+type SenderKey = tuple[int, int]
+
+
+def is_dtx_packet(payload: bytes) -> bool:
+    """仅含 TOC 字节的包即 DTX 帧，libopus 将其按丢包补偿（PLC）解码。"""
+    return len(payload) <= 1
+
+
+def packet_frame_size(payload: bytes) -> int:
+    """
+    按 TOC 字节（RFC 6716 3.1）计算包内音频的每声道样本数（48kHz），无法解析时返回 0。
+    发送方可各自选择帧时长，接收端据此得知每个包的时长，无需额外协商。
+    """
+    if not payload:
+        return 0
+    toc = payload[0]
+    config_number = toc >> 3
+    if config_number < 12:
+        # SILK：10/20/40/60ms
+        size = (480, 960, 1920, 2880)[config_number % 4]
+    elif config_number < 16:
+        # Hybrid：10/20ms
+        size = (480, 960)[config_number % 2]
+    else:
+        # CELT：2.5/5/10/20ms
+        size = (120, 240, 480, 960)[config_number % 4]
+    code = toc & 0x03
+    if code == 0:
+        return size
+    if code < 3:
+        return size * 2
+    return size * (payload[1] & 0x3F) if len(payload) > 1 else 0
 
 
 @dataclass
 class SteamArgs:
-    """音频流参数：采样率、声道数、设备索引、帧大小。"""
+    """音频流参数：采样率、声道数、设备索引、帧大小（设备每次回调的样本数），以及 Opus 帧时长（ms）。"""
     sample_rate: int
     channel: int
     device_index: Optional[int]
     frame_size: int
+    frame_time: int = default_frame_time
+
+    @property
+    def opus_frame_size(self) -> int:
+        """一个 Opus 帧的每声道样本数。"""
+        return opus_default_sample_rate * self.frame_time // 1000
 
 
 class OpusDecoder:
+    """
+    单声道 Opus 解码器：接收路径（解码、重采样、混音）内部统一为单声道，多声道设备只在写入设备缓冲时展开，
+    发送方的立体声包由 libopus 直接下混为单声道。
+    直接调用 libopus 的浮点解码接口写入预先分配的缓冲，不经过 int16 与 bytes 中转。
+    """
+
     def __init__(self, args: SteamArgs):
         self._frame_size: int = 0
+        self._last_frame_size: int = default_frame_size  # 上一个正常解码帧的每声道样本数，PLC/FEC 按此时长补偿
         self._decoder: Optional[Decoder] = None
+        self._pcm: NDArray[float32] = zeros(opus_max_frame_size, dtype=float32)
+        self._pcm_pointer = self._pcm.ctypes.data_as(c_float_pointer)
         self.update(args)
         logger.debug(f"OpusDecoder > OPUS decoder created with sample rate {opus_default_sample_rate} Hz, "
-                     f"channels {args.channel}, frame size {self._frame_size}")
+                     f"mono, frame size {self._frame_size}")
+
+    @property
+    def last_frame_size(self) -> int:
+        return self._last_frame_size
 
     def update(self, args: SteamArgs):
-        self._frame_size = args.channel * default_frame_size
-        self._decoder = Decoder(opus_default_sample_rate, args.channel)
+        # 解码输出按单包最大时长预留，发送方可使用任意帧时长
+        self._frame_size = opus_max_frame_size
+        self._last_frame_size = default_frame_size
+        self._decoder = Decoder(opus_default_sample_rate, 1)
 
-    def decode(self, encoded_data: bytes) -> Optional[ndarray]:
+    def decode(self, encoded_data: Optional[bytes], fec: bool = False,
+               out: Optional[NDArray[float32]] = None) -> Optional[NDArray[float32]]:
+        """
+        解码一帧。encoded_data 为 None 时做丢包补偿（PLC），按上一帧的时长外推；
+        fec 为 True 时 encoded_data 应为丢失帧的下一个包，从其带内冗余中恢复丢失的那一帧，
+        该包不含 FEC 数据时 libopus 自动退化为 PLC。
+        结果写入 out（连续的 float32 数组），未给出时写入解码器自己的缓冲，返回其中已解码部分的视图；
+        解码器自己的缓冲在下一次解码时被覆盖，调用方应立即写入播放缓冲或重采样器。
+        """
+        if out is None:
+            out, pointer = self._pcm, self._pcm_pointer
+        else:
+            pointer = out.ctypes.data_as(c_float_pointer)
+        state = self._decoder.decoder_state  # type: ignore
         try:
-            pcm_data = self._decoder.decode(encoded_data, self._frame_size)  # type: ignore
-            audio_data = frombuffer(pcm_data, dtype=int16)
-            audio_data = audio_data.astype(float32) / 32768.0  # type: ignore
-            return audio_data
+            if encoded_data is None:
+                result = libopus_decode_float(state, None, 0, pointer, min(self._last_frame_size, out.size), 0)
+            elif fec:
+                result = libopus_decode_float(state, encoded_data, len(encoded_data), pointer,
+                                              min(self._last_frame_size, out.size), 1)
+            else:
+                result = libopus_decode_float(state, encoded_data, len(encoded_data), pointer,
+                                              min(self._frame_size, out.size), 0)
+            if result < 0:
+                raise OpusError(result)
+            if encoded_data is not None and not fec:
+                self._last_frame_size = result
+            return out[:result]
         except Exception as e:
             logger.error(f"OpusDecoder > OPUS decoding error: {e}")
             return None
 
+    def reset(self):
+        """重置解码器内部状态，等价于新建的解码器。"""
+        if self._decoder is not None:
+            self._decoder.reset_state()
+        self._last_frame_size = default_frame_size
+
     def __del__(self):
         if self._decoder is not None:
             del self._decoder
             self._decoder = None
 
 
+class OpusDecoderPool:
+    """
+    按发送方 (cid, transmitter) 分配独立的 OpusDecoder，避免不同发送方共用一个有状态解码器。
+    超出容量或空闲超时的解码器按 LRU 淘汰，被淘汰的解码器重置状态后留作复用。
+    """
+
+    def __init__(self, args: SteamArgs, capacity: int = opus_decoder_pool_capacity,
+                 idle_timeout: float = opus_decoder_idle_timeout):
+        self._args = replace(args)
+        self._capacity = capacity
+        self._idle_timeout = idle_timeout
+        self._decoders: OrderedDict[SenderKey, OpusDecoder] = OrderedDict()
+        self._last_used: dict[SenderKey, float] = {}
+        self._free: list[OpusDecoder] = []
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        return self._evictions
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._decoders),
+            "capacity": self._capacity,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
+
+    def get(self, sender: SenderKey) -> OpusDecoder:
+        """取得该发送方的解码器，不存在时复用空闲解码器或新建。"""
+        now = monotonic()
+        decoder = self._decoders.get(sender)
+        if decoder is not None:
+            self._hits += 1
+            self._decoders.move_to_end(sender)
+            self._last_used[sender] = now
+            return decoder
+        self._misses += 1
+        self._evict_idle(now)
+        if len(self._decoders) >= self._capacity:
+            self._evict(next(iter(self._decoders)))
+        decoder = self._free.pop() if self._free else OpusDecoder(self._args)
+        self._decoders[sender] = decoder
+        self._last_used[sender] = now
+        return decoder
+
+    def _evict_idle(self, now: float) -> None:
+        # OrderedDict 按最近使用排序，队首即最久未使用
+        for sender in list(self._decoders):
+            if now - self._last_used[sender] < self._idle_timeout:
+                break
+            self._evict(sender)
+
+    def _evict(self, sender: SenderKey) -> None:
+        self._evictions += 1
+        logger.trace(f"OpusDecoderPool > decoder of sender {sender} evicted")
+        self._recycle(sender)
+
+    def _recycle(self, sender: SenderKey) -> None:
+        decoder = self._decoders.pop(sender)
+        self._last_used.pop(sender, None)
+        decoder.reset()
+        if len(self._free) < self._capacity:
+            self._free.append(decoder)
+
+    def update(self, args: SteamArgs):
+        """输出参数变化时丢弃全部解码器，之后按新参数重新创建。"""
+        self._args = replace(args)
+        self.clear()
+        self._free.clear()
+
+    def clear(self):
+        """回收全部解码器（如停止播放时）。"""
+        for sender in list(self._decoders):
+            self._recycle(sender)
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """
+    编码器档位：复杂度（0-10）、应用模式（opuslib APPLICATION_*）、信号类型（opuslib SIGNAL_* 或 AUTO）
+    与最大带宽（opuslib BANDWIDTH_*），自适应码率给出的带宽不会超过档位的上限。
+    """
+    name: str
+    complexity: int
+    application: int
+    signal: int
+    bandwidth: int
+
+
+# 各档位都不用 APPLICATION_RESTRICTED_LOWDELAY：它只用 CELT，带内 FEC（SILK 的 LBRR）随之失效
+encoder_profiles: dict[str, EncoderProfile] = {profile.name: profile for profile in (
+    # 低复杂度，带宽限为宽带，编码器只用 SILK，不进入同时运行 SILK 与 CELT 的混合模式
+    EncoderProfile("low_cpu", 1, APPLICATION_VOIP, SIGNAL_VOICE, BANDWIDTH_WIDEBAND),
+    EncoderProfile("balanced", 5, APPLICATION_VOIP, SIGNAL_VOICE, BANDWIDTH_SUPERWIDEBAND),
+    # 默认档位：与引入档位前固定使用的参数相同（libopus 的默认复杂度、信号类型与带宽）
+    EncoderProfile("standard", 9, APPLICATION_VOIP, AUTO, BANDWIDTH_FULLBAND),
+    EncoderProfile("quality", 10, APPLICATION_AUDIO, AUTO, BANDWIDTH_FULLBAND),
+)}
+default_encoder_profile: str = "standard"
+
+
 class OpusEncoder:
-    """Opus 编码器：将麦克风 PCM 编码为 Opus 字节流用于发送。"""
+    """
+    单声道 Opus 编码器：将麦克风 PCM 编码为 Opus 字节流用于发送，多声道麦克风由采集端先合为单声道。
+    启用 DTX 时先经能量门限判定，静音帧不编码，只在进入静音时及之后每隔 opus_dtx_keepalive_frames 帧
+    返回一个 DTX 包，其余静音帧返回空字节串（调用方不发送）；libopus 自身判定无需发送的帧同样按此处理。
+    复杂度、应用模式、信号类型与带宽上限由档位决定，档位由调用方在创建或 update 时给出。
+    float32 输入（[-1, 1]）直接调用 libopus 的浮点编码接口，int16 输入走整数接口，编码结果写入预先分配的输出缓冲。
+    自适应码率给出的参数由 apply_settings 暂存，在采集线程下一次编码前生效，避免与正在进行的编码并发调用 encoder_ctl。
+    """
 
-    def __init__(self, args: SteamArgs):
+    def __init__(self, args: SteamArgs, profile: EncoderProfile = encoder_profiles[default_encoder_profile]):
         self._frame_size: int = 0
         self._encoder: Optional[Encoder] = None
+        self._profile: EncoderProfile = profile
+        self._lookahead = 0
+        self._fec = False
+        self._expected_loss = 0
+        self._settings: Optional[EncoderSettings] = None
+        self._settings_pending = False
+        self._dtx = False
+        self._vad_threshold = 0.0
+        self._hangover = 0
+        self._silent_frames = 0
+        self._dtx_packet = b""
+        self._packet = (c_char * opus_max_packet_size)()
+        self._pcm_source: Optional[ndarray] = None  # 调用方每次传入的同一帧缓冲，缓存其指针
+        self._pcm_pointer = None
         self.update(args)
         logger.debug(f"OpusEncoder > OPUS encoder created with sample rate {opus_default_sample_rate} Hz, "
-                     f"channels {args.channel}, frame size {self._frame_size}")
+                     f"mono, frame size {self._frame_size}, profile {self._profile.name}")
 
-    def update(self, args: SteamArgs):
-        self._frame_size = args.channel * default_frame_size
+    @property
+    def frame_size(self) -> int:
+        """每次 encode 需要的每声道样本数。"""
+        return self._frame_size
+
+    @property
+    def profile(self) -> EncoderProfile:
+        return self._profile
+
+    @property
+    def lookahead(self) -> int:
+        """编码器的算法延迟（48kHz 样本数），解码出的音频比输入晚这么多。"""
+        return self._lookahead
+
+    def update(self, args: SteamArgs, profile: Optional[EncoderProfile] = None):
+        """按新参数重建编码器；profile 为 None 时沿用当前档位。"""
+        # opus_encode 的 frame_size 为每声道样本数
+        frame_time = args.frame_time if args.frame_time in opus_frame_times else default_frame_time
+        self._frame_size = opus_default_sample_rate * frame_time // 1000
 
-        self._encoder = Encoder(opus_default_sample_rate, args.channel, APPLICATION_VOIP)
+        if profile is not None:
+            self._profile = profile
+        self._encoder = Encoder(opus_default_sample_rate, 1, self._profile.application)
         self._encoder.bitrate = opus_default_bitrate
+        state = self._encoder.encoder_state
+        encoder_ctl(state, opus_ctl.set_complexity, self._profile.complexity)
+        encoder_ctl(state, opus_ctl.set_signal, self._profile.signal)
+        encoder_ctl(state, opus_ctl.set_max_bandwidth, self._profile.bandwidth)
+        self._lookahead = encoder_ctl(state, opus_ctl.get_lookahead)
+        self.set_fec(config.audio.opus_fec, config.audio.opus_expected_loss)
+        self.set_dtx(config.audio.opus_dtx, config.audio.vad_threshold)
+        # 新建的编码器回到默认码率，重新应用自适应码率的参数
+        self._settings_pending = self._settings is not None
+        # TOC 字节：SILK 宽带，帧时长与编码一致，单声道单帧；不带帧数据
+        config_number = 8 + opus_frame_times.index(frame_time)
+        self._dtx_packet = bytes([config_number << 3])
+
+    def set_fec(self, enabled: bool, expected_loss: int) -> None:
+        """
+        设置带内 FEC 与预期丢包率（百分比）。丢包率越高，编码器为冗余分配的码率越多；
+        opuslib 的 inband_fec 属性 setter 不传值，这里直接调用 encoder_ctl。
+        """
+        self._fec = enabled
+        self._expected_loss = min(max(expected_loss, 0), 100)
+        state = self._encoder.encoder_state  # type: ignore
+        encoder_ctl(state, opus_ctl.set_inband_fec, 1 if enabled else 0)
+        encoder_ctl(state, opus_ctl.set_packet_loss_perc, self._expected_loss if enabled else 0)
+
+    @property
+    def settings(self) -> Optional[EncoderSettings]:
+        return self._settings
+
+    def apply_settings(self, settings: Optional[EncoderSettings]) -> None:
+        """暂存自适应码率的编码参数，可在任意线程调用；为 None 时恢复默认码率与配置的 FEC 预期丢包率。"""
+        self._settings = settings
+        self._settings_pending = True
+
+    def _update_settings(self, encoder: Encoder) -> None:
+        self._settings_pending = False
+        settings = self._settings
+        state = encoder.encoder_state
+        if settings is None:
+            encoder_ctl(state, opus_ctl.set_bitrate, opus_default_bitrate)
+            encoder_ctl(state, opus_ctl.set_max_bandwidth, self._profile.bandwidth)
+            expected_loss = self._expected_loss
+        else:
+            encoder_ctl(state, opus_ctl.set_bitrate, settings.bitrate)
+            # BANDWIDTH_* 由窄到宽递增，取两者中较窄的
+            encoder_ctl(state, opus_ctl.set_max_bandwidth, min(settings.bandwidth, self._profile.bandwidth))
+            expected_loss = settings.expected_loss
+        if self._fec:
+            encoder_ctl(state, opus_ctl.set_packet_loss_perc, expected_loss)
+
+    def set_dtx(self, enabled: bool, threshold: float) -> None:
+        """启用/关闭 DTX，threshold 为静音判定门限（dBFS）。同时设置 libopus 自身的 DTX。"""
+        self._dtx = enabled
+        self._vad_threshold = threshold
+        encoder_ctl(self._encoder.encoder_state, opus_ctl.set_dtx, 1 if enabled else 0)  # type: ignore
+        self.reset_dtx()
+
+    def reset_dtx(self) -> None:
+        """重置静音判定状态，每次按下 PTT 时开头的帧总是发送。"""
+        self._hangover = vad_hangover_frames
+        self._silent_frames = 0
+
+    def _voice_active(self, audio_data: ndarray) -> bool:
+        scale = 32768.0 if audio_data.dtype == int16 else 1.0
+        samples = audio_data.reshape(-1).astype(float32, copy=False)
+        energy = float(dot(samples, samples)) / (samples.size * scale * scale)
+        if 10 * log10(energy + 1e-12) >= self._vad_threshold:
+            self._hangover = vad_hangover_frames
+            return True
+        if self._hangover > 0:
+            self._hangover -= 1
+            return True
+        return False
+
+    def _silent_frame(self) -> bytes:
+        """静音帧：进入静音时及之后每隔 opus_dtx_keepalive_frames 帧返回一个 DTX 包，其余返回空字节串。"""
+        self._silent_frames += 1
+        if self._silent_frames % opus_dtx_keepalive_frames == 1:
+            return self._dtx_packet
+        return b""
 
     def encode(self, audio_data: ndarray) -> Optional[bytes]:
+        # update 可能在其他线程替换编码器，本次编码全程持有同一个编码器的引用，其状态在调用 libopus 期间不会被释放
+        encoder, frame_size = self._encoder, self._frame_size
+        if encoder is None:
+            return None
+        if audio_data.shape[0] != frame_size:
+            # 原始指针按 frame_size 读取输入，长度不符时 libopus 会越界读
+            logger.error(f"OpusEncoder > frame of {audio_data.shape[0]} samples, expected {frame_size}")
+            return None
+        if self._settings_pending:
+            self._update_settings(encoder)
+        if self._dtx and not self._voice_active(audio_data):
+            return self._silent_frame()
         try:
-            if audio_data.dtype != int16:
-                audio_data = audio_data.astype(int16) * 32767
-            pcm_data = audio_data.tobytes()
-            encoded_data = self._encoder.encode(pcm_data, self._frame_size)  # type: ignore
-            return encoded_data
+            if audio_data.dtype == int16:
+                packet = encoder.encode(audio_data.tobytes(), frame_size)
+            else:
+                if audio_data is self._pcm_source:
+                    pointer = self._pcm_pointer
+                else:
+                    pcm = ascontiguousarray(audio_data, dtype=float32)
+                    pointer = pcm.ctypes.data_as(c_float_pointer)
+                    # 只有无需拷贝（调用方的缓冲本身可直接使用）时才缓存，之后原地写入新一帧也能直接编码
+                    if pcm is audio_data:
+                        self._pcm_source, self._pcm_pointer = audio_data, pointer
+                result = libopus_encode_float(encoder.encoder_state, pointer, frame_size,
+                                              self._packet, opus_max_packet_size)
+                if result < 0:
+                    raise OpusError(result)
+                packet = string_at(self._packet, result)
+            if self._dtx:
+                if len(packet) <= 2:
+                    # libopus 自身的 DTX 判定该帧无需发送（不超过 2 字节），与能量门限判定的静音帧一样按保活间隔发送
+                    return self._silent_frame()
+                self._silent_frames = 0
+            return packet
         except Exception as e:
             logger.error(f"OpusEncoder > OPUS encoding error: {e}")
             return None
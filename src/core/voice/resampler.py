@@ -0,0 +1,82 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""流式重采样：soxr ResampleStream 跨回调保留滤波器状态，环形缓冲按固定帧长切分输出。"""
+from typing import Optional
+
+from numpy import dtype as np_dtype, float32
+from numpy.typing import DTypeLike, NDArray
+from soxr import ResampleStream  # type: ignore
+
+from .ring_buffer import AudioRingBuffer
+
+
+class StreamResampler:
+    """
+    有状态重采样器：push 任意长度的输入，pull_into 读出到调用方的缓冲。
+    输入/输出均为 (帧数, 声道数) 的二维数组；输入输出采样率一致时不经过 soxr，仅作累加器使用。
+    输出存放在定长环形缓冲中（默认约 100ms），push 与 pull 可分别位于生产者与消费者线程。
+    quality 为 soxr 的质量档位，档位越高滤波器留存的样本越多：44.1kHz -> 48kHz 时 HQ 约 14.6ms，LQ 约 0.5ms。
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1, dtype: DTypeLike = float32,
+                 capacity: Optional[int] = None, quality: str = "HQ"):
+        self._in_rate = in_rate
+        self._out_rate = out_rate
+        self._channels = channels
+        self._dtype = np_dtype(dtype)
+        self._stream: Optional[ResampleStream] = None
+        if in_rate != out_rate:
+            self._stream = ResampleStream(in_rate, out_rate, channels, dtype=self._dtype.name, quality=quality)
+        self._buffer = AudioRingBuffer(capacity or max(out_rate // 10, 1), channels, self._dtype)
+        self._pushed = 0  # 送入的输入帧数
+        self._produced = 0  # 滤波器输出的帧数
+
+    @property
+    def resampling(self) -> bool:
+        """是否真正进行重采样（输入输出采样率不同）。"""
+        return self._stream is not None
+
+    @property
+    def in_rate(self) -> int:
+        return self._in_rate
+
+    @property
+    def delay(self) -> float:
+        """已送入但仍留在滤波器中、尚未输出的音频时长（秒），即重采样带来的延迟。"""
+        return max(self._pushed / self._in_rate - self._produced / self._out_rate, 0.0)
+
+    @property
+    def available(self) -> int:
+        """缓冲中可读取的输出帧数。"""
+        return self._buffer.available
+
+    @property
+    def dropped(self) -> int:
+        """缓冲已满而丢弃的输出帧数。"""
+        return self._buffer.dropped
+
+    def push(self, data: NDArray) -> None:
+        """送入一段输入，形状为 (帧数, 声道数)；缓冲放不下的输出被丢弃。"""
+        if data.shape[0] == 0:
+            return
+        self._pushed += data.shape[0]
+        if self._stream is not None:
+            data = self._stream.resample_chunk(data.astype(self._dtype, copy=False))
+        self._produced += data.shape[0]
+        self._buffer.write(data)
+
+    def pull_into(self, out: NDArray) -> int:
+        """读取至多 out.shape[0] 帧到 out 中，返回实际读取的帧数。"""
+        return self._buffer.read_into(out)
+
+    def skip(self, frame_count: int) -> int:
+        """丢弃至多 frame_count 个最旧的输出帧，返回实际丢弃的帧数。仅由消费者调用。"""
+        return self._buffer.skip(frame_count)
+
+    def reset(self) -> None:
+        """清空滤波器历史与缓冲，用于一段连续音频结束后（如松开 PTT）。"""
+        if self._stream is not None:
+            self._stream.clear()
+        self._buffer.clear()
+        self._pushed = 0
+        self._produced = 0
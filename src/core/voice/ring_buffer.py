@@ -0,0 +1,82 @@
+#  Copyright (c) 2026 Half_nothing
+#  SPDX-License-Identifier: MIT
+"""定长环形缓冲：预分配 NumPy 存储的单生产者/单消费者音频缓冲，读写不加锁、不分配内存。"""
+from numpy import dtype as np_dtype, float32, zeros
+from numpy.typing import DTypeLike, NDArray
+
+
+class AudioRingBuffer:
+    """
+    单生产者/单消费者的音频环形缓冲，存储形状为 (容量帧数, 声道数)。
+    读写位置为只增不减的计数，生产者只修改写位置、消费者只修改读位置，依赖 GIL 下整数赋值的原子性而无需加锁。
+    缓冲满时 write 只写入放得下的部分，超出的样本被丢弃，以此限制缓冲带来的延迟。
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype: DTypeLike = float32):
+        self._capacity = capacity
+        self._channels = channels
+        self._dtype = np_dtype(dtype)
+        self._buffer: NDArray = zeros((capacity, channels), dtype=self._dtype)
+        self._read = 0
+        self._write = 0
+        self._dropped = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def channels(self) -> int:
+        return self._channels
+
+    @property
+    def available(self) -> int:
+        """可读取的帧数。"""
+        return self._write - self._read
+
+    @property
+    def free(self) -> int:
+        """可写入的帧数。"""
+        return self._capacity - (self._write - self._read)
+
+    @property
+    def dropped(self) -> int:
+        """因缓冲已满而丢弃的帧数。"""
+        return self._dropped
+
+    def write(self, data: NDArray) -> int:
+        """写入 (帧数, 声道数) 的数据，返回实际写入的帧数。仅由生产者调用。"""
+        n = min(data.shape[0], self.free)
+        self._dropped += data.shape[0] - n
+        if n <= 0:
+            return 0
+        start = self._write % self._capacity
+        first = min(n, self._capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        if first < n:
+            self._buffer[:n - first] = data[first:n]
+        self._write += n
+        return n
+
+    def read_into(self, out: NDArray) -> int:
+        """读取至多 out.shape[0] 帧到 out 中，返回实际读取的帧数，其余部分不修改。仅由消费者调用。"""
+        n = min(out.shape[0], self.available)
+        if n <= 0:
+            return 0
+        start = self._read % self._capacity
+        first = min(n, self._capacity - start)
+        out[:first] = self._buffer[start:start + first]
+        if first < n:
+            out[first:n] = self._buffer[:n - first]
+        self._read += n
+        return n
+
+    def skip(self, frame_count: int) -> int:
+        """丢弃至多 frame_count 帧，返回实际丢弃的帧数。仅由消费者调用。"""
+        n = min(frame_count, self.available)
+        self._read += n
+        return n
+
+    def clear(self) -> None:
+        """清空缓冲。仅由消费者调用（或在没有生产者写入时调用）。"""
+        self._read = self._write
@@ -2,44 +2,29 @@
 #  SPDX-License-Identifier: MIT
 """
 音频流：麦克风输入流、单路输出流、多路混合输出流。
-输入流编码为 Opus；输出流解码并可选重采样，支持冲突音/提示音插入。
+输入流编码为 Opus；输出流解码并可选重采样，支持冲突音/提示音插入。输出流内部均为单声道，写入设备缓冲时才展开到设备声道数。
 """
 from abc import ABC, abstractmethod
-from queue import Empty, Full, Queue
-from typing import Callable, Optional
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter
+from typing import Callable, Optional, cast
 
 from loguru import logger
-from numpy import float32, frombuffer, int16, tanh, zeros
+from numpy import add, copyto, dot, float32, frombuffer, int16, multiply, tanh, zeros
 from numpy.typing import NDArray
-from pyaudio import PyAudio, Stream, paContinue, paFloat32, paInt16
-from soxr import resample  # type: ignore
+from pyaudio import PyAudio, Stream, paContinue, paFloat32, paInputOverflow, paInt16
 
 from src.config import config
-from src.constants import default_sample_rate, opus_default_sample_rate
-from .opus import OpusDecoder, OpusEncoder, SteamArgs
-from .tone_generator import ToneGenerator
-
-
-def _resample_to_output(
-        audio_data: NDArray[float32],
-        out_sample_rate: int,
-        frame_size: int,
-        volume: float,
-) -> list[NDArray[float32]]:
-    """将解码后的 PCM 重采样到输出采样率，并按 frame_size 切分为多帧，每帧乘以 volume。"""
-    if audio_data.size == 0:
-        return []
-    resampled = resample(
-        audio_data, opus_default_sample_rate, out_sample_rate
-    ).astype(float32)
-    resampled = (resampled * volume).clip(-1.0, 1.0)
-    frames = []
-    for i in range(0, resampled.size, frame_size):
-        end = min(i + frame_size, resampled.size)
-        chunk = zeros(frame_size, dtype=float32)
-        chunk[: end - i] = resampled[i:end]
-        frames.append(chunk)
-    return frames
+from src.constants import audio_ring_buffer_time, conflict_tone_frequency, decode_ahead_size, default_frame_size, \
+    default_frame_time_s, default_sample_rate, monitor_latency_smoothing, monitor_max_backlog, \
+    opus_decoder_idle_timeout, opus_decoder_pool_capacity, opus_default_sample_rate, opus_max_frame_size, tone_amplitude
+from .clock_drift import DriftCompensator
+from .decode_worker import DecodeWorker
+from .jitter_buffer import FrameStatus, JitterBuffer
+from .opus import OpusDecoder, OpusDecoderPool, OpusEncoder, SenderKey, SteamArgs
+from .resampler import StreamResampler
+from .ring_buffer import AudioRingBuffer
+from .tone_generator import ToneCache, ToneLoopReader
 
 
 class AudioStream(ABC):
@@ -50,6 +35,41 @@ class AudioStream(ABC):
         self._stream: Optional[Stream] = None
         self._active = False
         self._sample_rate = default_sample_rate
+        self._channel = 1
+        self._out: NDArray[float32] = zeros(0, dtype=float32)
+        self._out_bytes = memoryview(self._out).cast("B").toreadonly()
+        self._out_frames: NDArray[float32] = self._out.reshape(-1, 1)
+        self._mono: NDArray[float32] = self._out
+        self._mono_frames: NDArray[float32] = self._out_frames
+
+    def _output_buffer(self, frame_count: int) -> NDArray[float32]:
+        """
+        输出回调复用的预分配单声道缓冲（frame_count 个样本），回调帧数或声道数变化时才重新分配。
+        单声道设备时它就是设备缓冲本身；多声道设备时由 _device_output 展开到设备缓冲。
+        其 (帧数, 1) 形状的视图 _mono_frames 随之创建，回调中直接使用，不必每次 reshape。
+        """
+        sample_count = frame_count * self._channel
+        if self._out.size != sample_count or self._mono.size != frame_count:
+            self._out = zeros(sample_count, dtype=float32)
+            self._out_bytes = memoryview(self._out).cast("B").toreadonly()
+            self._out_frames = self._out.reshape(-1, self._channel)
+            self._mono = self._out if self._channel == 1 else zeros(frame_count, dtype=float32)
+            self._mono_frames = self._mono.reshape(-1, 1)
+        return self._mono
+
+    def _device_output(self) -> bytes:
+        """
+        把单声道缓冲按广播复制到设备缓冲的每个声道，返回设备缓冲的只读字节视图。
+        PyAudio 在回调返回时即复制其内容，无需 tobytes；其类型存根只声明了 bytes，实际接受任何缓冲协议对象。
+        """
+        if self._mono is not self._out:
+            copyto(self._out_frames, self._mono_frames)
+        return cast(bytes, self._out_bytes)
+
+    @abstractmethod
+    def _prepare(self, args: SteamArgs):
+        """按流参数分配回调与处理线程使用的缓冲、重采样器，不打开设备；start 在打开设备前调用。"""
+        raise NotImplementedError
 
     @abstractmethod
     def start(self, args: SteamArgs):
@@ -63,13 +83,28 @@ class AudioStream(ABC):
     def active(self) -> bool:
         return self._active
 
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    @property
+    def channel(self) -> int:
+        return self._channel
+
     def restart(self, args: SteamArgs):
         self.stop()
         self.start(args)
 
 
 class InputAudioSteam(AudioStream):
-    """麦克风输入流：回调内重采样、增益后 Opus 编码，通过 on_encoded_audio 送出。"""
+    """
+    麦克风输入流：回调只把采集到的样本写入采集环形缓冲；编码线程从中取出，合为单声道并增益、流式重采样后
+    按整帧 Opus 编码，通过 on_encoded_audio 送出。回调不做任何计算与网络发送，网络阻塞或 GIL 争用不会导致输入溢出。
+    多声道麦克风按配置 input_channel 取其中一个声道或各声道平均，重采样与编码都只处理单声道。
+    增益与切帧都在 start() 预分配的缓冲中原地完成。
+    设置 on_captured_audio 时，每批增益后的单声道浮点样本（设备采样率）先交给它，用于设备测试的直接监听；
+    未设置 on_encoded_audio 时不再重采样与编码。
+    """
 
     def __init__(self, audio: PyAudio, encoder: OpusEncoder,
                  on_encoded_audio: Optional[Callable[[bytes], None]] = None):
@@ -77,7 +112,27 @@ class InputAudioSteam(AudioStream):
         self._input_active = False
         self._encoder = encoder
         self._on_encoded_audio: Optional[Callable[[bytes], None]] = on_encoded_audio
+        self._on_captured_audio: Optional[Callable[[NDArray[float32], int], None]] = None
+        self._sample_time = 0.0  # 最近交出的音频中最后一个样本的采集时刻（perf_counter）
         self._gain = 0  # 默认0dB
+        self._gain_factor = 1.0
+        self._channel = 1
+        self._input_channel: Optional[int] = None  # 多声道时取用的声道，None 为各声道平均
+        self._capture: Optional[AudioRingBuffer] = None
+        self._captured_at = 0.0  # 最近一次回调写入采集缓冲的时刻（perf_counter）
+        self._resampler: Optional[StreamResampler] = None
+        self._block: NDArray[int16] = zeros((0, 1), dtype=int16)
+        self._gain_buffer: NDArray[float32] = zeros(0, dtype=float32)
+        self._frame: NDArray[float32] = zeros((default_frame_size, 1), dtype=float32)
+        self._restart_pending = False
+        self._wakeup = Event()
+        self._encode_thread: Optional[Thread] = None
+        self._overflows = 0
+        self._encoded_frames = 0
+        self._encode_time = 0.0
+        self._encode_time_max = 0.0
+        self._latency = 0.0
+        self._latency_max = 0.0
 
     @property
     def gain(self) -> int:
@@ -86,6 +141,7 @@ class InputAudioSteam(AudioStream):
     @gain.setter
     def gain(self, gain: int):
         self._gain = gain
+        self._gain_factor = 10 ** (gain / 20)
 
     @property
     def input_active(self) -> bool:
@@ -93,6 +149,9 @@ class InputAudioSteam(AudioStream):
 
     @input_active.setter
     def input_active(self, input_active: bool):
+        if input_active and not self._input_active:
+            # 新的一次发射：编码线程先丢弃重采样器中上次发射的残余样本并重置静音判定
+            self._restart_pending = True
         self._input_active = input_active
 
     @property
@@ -100,29 +159,153 @@ class InputAudioSteam(AudioStream):
         return self._on_encoded_audio
 
     @on_encoded_audio.setter
-    def on_encoded_audio(self, on_encoded_audio: Callable[[bytes], None]):
+    def on_encoded_audio(self, on_encoded_audio: Optional[Callable[[bytes], None]]):
         self._on_encoded_audio = on_encoded_audio
 
-    def _callback(self, in_data, _, __, ___):
-        if self._input_active and self._on_encoded_audio:
-            audio_data = frombuffer(in_data, dtype=int16) * (10 ** (self._gain / 20))
-            audio_data = audio_data.clip(-32768, 32767).astype(int16)
+    @property
+    def on_captured_audio(self) -> Optional[Callable[[NDArray[float32], int], None]]:
+        """
+        以 (样本, 采样率) 接收增益后的单声道浮点样本，在编码线程中调用；
+        样本位于复用的缓冲中，需在回调内写入自己的缓冲。
+        """
+        return self._on_captured_audio
+
+    @on_captured_audio.setter
+    def on_captured_audio(self, on_captured_audio: Optional[Callable[[NDArray[float32], int], None]]):
+        self._on_captured_audio = on_captured_audio
+
+    @property
+    def sample_time(self) -> float:
+        """
+        最近一次交给 on_captured_audio / on_encoded_audio 的音频中最后一个样本的采集时刻（perf_counter，
+        以回调时刻计，不含设备输入延迟），在这两个回调内读取。
+        """
+        return self._sample_time
+
+    @property
+    def device_latency(self) -> float:
+        """PortAudio 报告的设备输入延迟（秒）。"""
+        stream = self._stream
+        return stream.get_input_latency() if stream is not None else 0.0
+
+    @property
+    def capture_stats(self) -> dict[str, float]:
+        """
+        采集与编码统计：overflows 为 PortAudio 报告的输入溢出次数，dropped 为采集缓冲已满而丢弃的帧数，
+        frames 为编码帧数，encode_avg_us/encode_max_us 为单帧编码耗时（微秒），
+        latency_avg_ms/latency_max_ms 为样本写入采集缓冲到编码数据送出的延迟（毫秒）。
+        """
+        capture = self._capture
+        frames = self._encoded_frames
+        return {
+            "overflows": self._overflows,
+            "dropped": capture.dropped if capture is not None else 0,
+            "frames": frames,
+            "encode_avg_us": round(self._encode_time / frames * 1e6, 1) if frames else 0.0,
+            "encode_max_us": round(self._encode_time_max * 1e6, 1),
+            "latency_avg_ms": round(self._latency / frames * 1000, 2) if frames else 0.0,
+            "latency_max_ms": round(self._latency_max * 1000, 2),
+        }
+
+    def _callback(self, in_data, _, __, status_flags):
+        if status_flags & paInputOverflow:
+            self._overflows += 1
+        capture = self._capture
+        if capture is None or not self._input_active or not (self._on_encoded_audio or self._on_captured_audio):
+            return None, paContinue
+        capture.write(frombuffer(in_data, dtype=int16).reshape(-1, self._channel))
+        self._captured_at = perf_counter()
+        self._wakeup.set()
+        return None, paContinue
+
+    def _encode_loop(self) -> None:
+        while self._active:
+            self._wakeup.wait(default_frame_time_s)
+            self._wakeup.clear()
+            try:
+                self._encode_pending()
+            except Exception as e:
+                logger.error(f"InputAudioSteam > encode error: {e}")
+
+    def _encode_pending(self) -> None:
+        """在编码线程中取出采集缓冲中的全部样本，增益、重采样、编码并送出。"""
+        capture = self._capture
+        resampler = self._resampler
+        on_encoded_audio = self._on_encoded_audio
+        on_captured_audio = self._on_captured_audio
+        if capture is None or resampler is None:
+            return
+        if self._restart_pending:
+            self._restart_pending = False
+            resampler.reset()
+            self._encoder.reset_dtx()
+        captured_at = self._captured_at
+        block = self._block
+        frame = self._frame
+        while capture.available > 0:
+            n = capture.read_into(block)
+            # 本批最后一个样本的采集时刻：其后仍在采集缓冲中的样本都晚于它
+            block_time = captured_at - capture.available / self._sample_rate
+            gained = self._gain_buffer[:n]
+            # 增益时一并换算为 [-1, 1] 的浮点数，之后重采样与编码都在浮点上进行，不再转回 int16
+            scale = self._gain_factor / 32768.0
+            if self._input_channel is None:
+                # 逐声道累加后乘以 增益/声道数，即各声道平均后增益
+                copyto(gained, block[:n, 0])
+                for channel in range(1, self._channel):
+                    add(gained, block[:n, channel], out=gained)
+                gained *= scale / self._channel
+            else:
+                multiply(block[:n, self._input_channel], scale, out=gained)
+            gained.clip(-1.0, 1.0, out=gained)
+            if on_captured_audio is not None:
+                self._sample_time = block_time
+                on_captured_audio(gained, self._sample_rate)
+            if on_encoded_audio is None:
+                continue
             # 重采样麦克风输入的音频
             # 麦克风输入的采样率通常为44100Hz
             # OPUS编码的音频采样率通常为48000Hz
-            resampled_audio = resample(audio_data, self._sample_rate, opus_default_sample_rate)
-            if len(resampled_audio) == 0:
-                logger.debug("InputAudioSteam > got empty data from microphone, ignored")
-                return None, paContinue
-            encoded_data = self._encoder.encode(resampled_audio)
-            if encoded_data:
-                self._on_encoded_audio(encoded_data)
-        return None, paContinue
+            # 重采样器跨批次保留滤波器状态，累加器保证每次送入编码器的都是完整的一帧
+            resampler.push(gained.reshape(-1, 1))
+            while resampler.available >= frame.shape[0]:
+                resampler.pull_into(frame)
+                # 帧尾样本之后的输入样本还留在重采样器中（滤波器内与已输出未取走的）
+                self._sample_time = block_time - resampler.delay - resampler.available / opus_default_sample_rate
+                start = perf_counter()
+                encoded_data = self._encoder.encode(frame)
+                elapsed = perf_counter() - start
+                if encoded_data:
+                    on_encoded_audio(encoded_data)
+                latency = perf_counter() - captured_at
+                self._encoded_frames += 1
+                self._encode_time += elapsed
+                self._encode_time_max = max(self._encode_time_max, elapsed)
+                self._latency += latency
+                self._latency_max = max(self._latency_max, latency)
+
+    def _prepare(self, args: SteamArgs):
+        self._sample_rate = args.sample_rate
+        self._channel = args.channel
+        input_channel = config.audio.input_channel
+        if args.channel == 1:
+            self._input_channel = 0
+        elif 0 <= input_channel < args.channel:
+            self._input_channel = input_channel
+        else:
+            self._input_channel = None
+        self._capture = AudioRingBuffer(int(args.sample_rate * audio_ring_buffer_time), args.channel, int16)
+        self._resampler = StreamResampler(args.sample_rate, opus_default_sample_rate, 1, float32)
+        self._block = zeros((args.frame_size, args.channel), dtype=int16)
+        self._gain_buffer = zeros(args.frame_size, dtype=float32)
+        # 编码器的帧时长可配置，按编码器每次需要的样本数切帧
+        self._frame = zeros((self._encoder.frame_size, 1), dtype=float32)
+        self._restart_pending = True
 
     def start(self, args: SteamArgs):
         if self._active:
             return
-        self._sample_rate = args.sample_rate
+        self._prepare(args)
         try:
             self._stream = self._audio.open(
                 format=paInt16,
@@ -134,6 +317,8 @@ class InputAudioSteam(AudioStream):
                 stream_callback=self._callback
             )
             self._active = True
+            self._encode_thread = Thread(target=self._encode_loop, name="InputEncoder", daemon=True)
+            self._encode_thread.start()
             self._stream.start_stream()
             logger.debug("InputAudioSteam > started audio recording")
         except Exception as e:
@@ -145,112 +330,164 @@ class InputAudioSteam(AudioStream):
             self._stream.close()
             self._stream = None
         self._active = False
+        if self._encode_thread is not None:
+            self._wakeup.set()
+            self._encode_thread.join()
+            self._encode_thread = None
+        self._capture = None
+        self._resampler = None
         logger.debug("InputAudioSteam > stopped audio recording")
 
 
 class OutputAudioSteam(AudioStream):
-    """单路播放流：队列接收编码数据或冲突波形，回调中解码/重采样后输出。"""
+    """
+    单路播放流：编码数据在送入方线程解码、重采样后写入环形缓冲，冲突波形写入独立的环形缓冲，
+    回调中直接从环形缓冲读出，冲突音优先。
+    play_pcm 送入的 PCM（直接监听）经低延迟重采样写入单独的监听缓冲，有监听数据时回调改读监听缓冲。
+    送入方给出样本的采集时刻时，回调按读出样本的采集时刻测量从采集到播放的延迟。
+    """
 
     def __init__(self, audio: PyAudio, decoder: OpusDecoder):
         super().__init__(audio)
         self._decoder = decoder
-        self._queue: Queue[bytes] = Queue()
-        self._conflict_queue: Queue[NDArray[float32]] = Queue()
-        self._generator = ToneGenerator()
+        self._resampler: Optional[StreamResampler] = None
+        self._conflict: Optional[AudioRingBuffer] = None
+        # 冲突缓冲有多个生产者（冲突音定时器、提示音），生产者之间加锁，回调读取不加锁
+        self._conflict_lock = Lock()
+        self._conflict_tone = ToneLoopReader(ToneCache())
         self._frame_size = 0
         self._channel = 1
         self._volume = 1.0
+        self._monitor: Optional[StreamResampler] = None
+        self._captured_at = 0.0  # 最近送入的样本的采集时刻（perf_counter），0 表示未知
+        self._latency = 0.0  # 平滑后的采集到播放的延迟（秒），0 表示尚未测得
 
     @property
     def frame_size(self) -> int:
         return self._frame_size
 
+    @property
+    def latency(self) -> float:
+        """平滑后的采集到写入设备缓冲的延迟（秒），不含设备输出延迟；尚未测得时为 0。"""
+        return self._latency
+
+    @property
+    def device_latency(self) -> float:
+        """PortAudio 报告的设备输出延迟（秒）。"""
+        stream = self._stream
+        return stream.get_output_latency() if stream is not None else 0.0
+
     def play_conflict(self, volume: float):
-        try:
-            self._conflict_queue.put_nowait(self._generator.generate_frame(self._frame_size) * self._volume * volume)
-        except Full:
-            return
+        # 冲突音按帧连续写入，从可无缝重复的缓存波形中接着上一帧读取
+        for wave in self._conflict_tone.next(conflict_tone_frequency, self._sample_rate,
+                                             tone_amplitude * self._volume * volume,
+                                             self._frame_size // self._channel):
+            self.enqueue_conflict_wave(wave)
 
     def enqueue_conflict_wave(self, wave: NDArray[float32]) -> None:
-        """将一段已经生成好的浮点波形送入冲突队列播放。"""
-        if not self._active or self._frame_size <= 0:
-            return
-        if wave.size == 0:
+        """将一段已经生成好的单声道浮点波形写入冲突缓冲播放。"""
+        conflict = self._conflict
+        if not self._active or conflict is None or wave.size == 0:
             return
-        try:
-            self._conflict_queue.put_nowait(wave.astype(float32))
-        except Full:
-            logger.debug("OutputAudioSteam > output conflict queue full, dropping beep")
-
-    def play_encoded_audio(self, encoded_data: bytes, conflict: bool = False, volume: float = 1.0):
-        """放入一帧编码数据或冲突音；冲突时仅播放冲突音。"""
+        with self._conflict_lock:
+            if conflict.write(wave.reshape(-1, 1)) < wave.size:
+                logger.debug("OutputAudioSteam > output conflict buffer full, dropping beep")
+
+    def play_encoded_audio(self, encoded_data: bytes, conflict: bool = False, volume: float = 1.0,
+                           captured_at: float = 0.0):
+        """
+        解码一帧编码数据写入播放缓冲，或放入冲突音；冲突时仅播放冲突音。
+        captured_at 为解码出的最后一个样本的采集时刻（perf_counter），用于测量延迟。
+        """
         self._volume = volume
         if conflict:
             self.play_conflict(config.audio.conflict_volume)
             return
-        try:
-            self._queue.put_nowait(encoded_data)
-        except Full:
-            logger.debug("OutputAudioSteam > Output queue full, dropping audio packet")
-
-    def _get_conflict_audio(self, sample_count: int) -> tuple[NDArray[float32], bool]:
-        try:
-            data = self._conflict_queue.get_nowait()
-            n = data.size
-            if n != sample_count:
-                if n >= sample_count:
-                    data = data[:sample_count].astype(float32)
-                else:
-                    out = zeros(sample_count, dtype=float32)
-                    out[:n] = data
-                    data = out
-            return data, True
-        except Empty:
-            return zeros(0, dtype=float32), False
-
-    def _get_audio(self, sample_count: int) -> tuple[NDArray[float32], bool]:
-        try:
-            encoded_data = self._queue.get_nowait()
-            audio_data = self._decoder.decode(encoded_data)
-            if audio_data is None:
-                return zeros(0, dtype=float32), False
-            # 重采样解码出来的音频数据
-            # OPUS编码的音频采样率通常为48000Hz
-            # 音频输出的采样率通常为44100Hz
-            resampled_audio = resample(audio_data, opus_default_sample_rate, self._sample_rate)
-            n = resampled_audio.size
-            if n != sample_count:
-                logger.warning(
-                    f"OutputAudioSteam > unmatched resampled audio size, expect {sample_count} but got {n}"
-                )
-                if n > sample_count:
-                    resampled_audio = resampled_audio[:sample_count].copy()
-                else:
-                    out = zeros(sample_count, dtype=float32)
-                    out[:n] = resampled_audio
-                    resampled_audio = out
-            return resampled_audio.astype(float32), True
-        except Empty:
-            return zeros(0, dtype=float32), False
+        resampler = self._resampler
+        if resampler is None:
+            return
+        audio_data = self._decoder.decode(encoded_data)
+        if audio_data is None or audio_data.size == 0:
+            return
+        # 重采样解码出来的音频数据
+        # OPUS编码的音频采样率通常为48000Hz
+        # 音频输出的采样率通常为44100Hz
+        dropped = resampler.dropped
+        resampler.push(audio_data.reshape(-1, 1))
+        self._captured_at = captured_at
+        if resampler.dropped > dropped:
+            logger.debug("OutputAudioSteam > output buffer full, dropping audio")
+
+    def play_pcm(self, audio_data: NDArray[float32], sample_rate: int, captured_at: float = 0.0):
+        """
+        直接播放一段单声道浮点 PCM（如麦克风直接监听），不经过编解码；captured_at 为最后一个样本的采集时刻。
+        按 soxr LQ 档位重采样，滤波器延迟不到 1ms；在同一个线程中调用。
+        """
+        if not self._active or audio_data.size == 0:
+            return
+        monitor = self._monitor
+        if monitor is None or monitor.in_rate != sample_rate:
+            monitor = StreamResampler(sample_rate, self._sample_rate, 1, float32,
+                                      int(self._sample_rate * audio_ring_buffer_time), "LQ")
+            self._monitor = monitor
+        monitor.push(audio_data.reshape(-1, 1))
+        self._captured_at = captured_at
+
+    def _measure_latency(self, source: StreamResampler, available: int) -> None:
+        # 读出的第一个样本比最近送入的样本早 available 帧，再加上仍留在重采样滤波器中的部分
+        captured_at = self._captured_at
+        if captured_at <= 0 or available <= 0:
+            return
+        latency = perf_counter() - captured_at + source.delay + available / self._sample_rate
+        if self._latency <= 0:
+            self._latency = latency
+        else:
+            self._latency += (latency - self._latency) * monitor_latency_smoothing
 
     def _callback(self, _, frame_count: int, __, ___) -> tuple[bytes, int]:
         # PyAudio 的 frame_count 为帧数，每帧含 channel 个样本，需返回 frame_count * channel 个样本
-        sample_count = frame_count * self._channel
-        data, success = self._get_conflict_audio(sample_count)
-        if success:
-            return (data * self._volume).clip(-1.0, 1.0).tobytes(), paContinue
-        data, success = self._get_audio(sample_count)
-        if success:
-            return (data * self._volume).clip(-1.0, 1.0).tobytes(), paContinue
-        return zeros(sample_count, dtype=float32).tobytes(), paContinue
+        out = self._output_buffer(frame_count)
+        frames = self._mono_frames
+        conflict = self._conflict
+        resampler = self._resampler
+        monitor = self._monitor
+        if conflict is not None and conflict.available > 0:
+            n = conflict.read_into(frames)
+        elif monitor is not None:
+            # 直接监听只保留少量积压，输入设备时钟偏快时丢弃最旧的样本，延迟不会越积越大
+            excess = monitor.available - int(self._sample_rate * monitor_max_backlog)
+            if excess > 0:
+                monitor.skip(excess)
+            self._measure_latency(monitor, monitor.available)
+            n = monitor.pull_into(frames)
+        elif resampler is not None:
+            self._measure_latency(resampler, resampler.available)
+            n = resampler.pull_into(frames)
+        else:
+            n = 0
+        if n < frame_count:
+            out[n:] = 0
+        if self._volume != 1.0:
+            out *= self._volume
+        out.clip(-1.0, 1.0, out=out)
+        return self._device_output(), paContinue
+
+    def _prepare(self, args: SteamArgs):
+        self._frame_size = args.frame_size
+        self._channel = args.channel
+        self._sample_rate = args.sample_rate
+        self._output_buffer(args.frame_size // args.channel)
+        capacity = int(args.sample_rate * audio_ring_buffer_time)
+        self._resampler = StreamResampler(opus_default_sample_rate, args.sample_rate, 1, float32, capacity)
+        self._conflict = AudioRingBuffer(capacity)
+        self._monitor = None
+        self._captured_at = 0.0
+        self._latency = 0.0
 
     def start(self, args: SteamArgs):
         if self._active:
             return
-        self._generator.update_sample_rate(args.sample_rate)
-        self._frame_size = args.frame_size
-        self._channel = args.channel
-        self._sample_rate = args.sample_rate
+        self._prepare(args)
         try:
             self._stream = self._audio.open(
                 format=paFloat32,
@@ -273,125 +510,384 @@ class OutputAudioSteam(AudioStream):
             self._stream.close()
             self._stream = None
         self._active = False
+        self._resampler = None
+        self._conflict = None
+        self._monitor = None
         logger.debug("OutputAudioSteam > stopped audio playback")
 
 
+class _SenderStream:
+    """
+    单个发送方的接收状态：抖动缓冲、所属 transmitter 与音量、Opus 采样率的解码样本 FIFO，以及时钟漂移补偿器。
+    FIFO 由解码线程写入、播放回调读取；sending 表示发送方仍在发送，starved 表示刚因缓冲耗尽做过补偿，均由解码线程更新。
+    """
+
+    __slots__ = ("transmitter_id", "volume", "jitter_buffer", "fifo", "drift", "sending", "starved")
+
+    def __init__(self, transmitter_id: int, fifo: AudioRingBuffer):
+        self.transmitter_id = transmitter_id
+        self.volume = 1.0
+        self.jitter_buffer = JitterBuffer()
+        self.fifo = fifo
+        self.drift = DriftCompensator()
+        self.sending = True
+        self.starved = False
+
+
 class MixedOutputAudioStream(AudioStream):
     """
     单设备混合输出：将多个 transmitter 的 PCM 按帧叠加后输出到同一设备。
-    解码在调用线程完成，每路一个队列存放已解码且重采样后的 float32 帧。
+    收到的包先进入所属发送方的抖动缓冲，解码线程按播放消耗的节奏取出，用解码器池中该发送方独立的解码器
+    提前解码到发送方的 FIFO；回调中以 opus_default_sample_rate 混音后经设备级的一个连续重采样器转换到设备采样率。
+    解码、混音与重采样都是单声道，多声道设备只在写入设备缓冲时展开。
     """
 
-    def __init__(self, audio: PyAudio, decoder: OpusDecoder):
+    def __init__(self, audio: PyAudio, decoder_pool: OpusDecoderPool, decode_worker: DecodeWorker):
         super().__init__(audio)
-        self._decoder = decoder
-        self._transmitter_queues: dict[int, Queue[NDArray[float32]]] = {}
-        self._conflict_queue: Queue[NDArray[float32]] = Queue()
-        self._generator = ToneGenerator()
+        self._decoder_pool = decoder_pool
+        self._decode_worker = decode_worker
+        self._decode_worker.add_source(self.decode_pending)
+        self._lock = Lock()
+        self._transmitters: set[int] = set()
+        self._senders: dict[SenderKey, _SenderStream] = {}
+        # 发送方的快照，增删发送方时（持锁）重建，播放回调只遍历快照，不必每次复制字典
+        self._mix_senders: tuple[_SenderStream, ...] = ()
+        self._output_resampler: Optional[StreamResampler] = None
+        self._conflict: Optional[AudioRingBuffer] = None
+        # 冲突缓冲有多个生产者（收包线程、提示音），生产者之间加锁，回调读取不加锁
+        self._conflict_lock = Lock()
+        self._mix_frame_size = default_frame_size  # 每次混音的帧数（Opus 采样率），取自输出参数的帧时长
+        # 混音矩阵：每行是一个发送方的一帧，按行乘以音量后求和
+        self._mix_matrix: NDArray[float32] = zeros((0, default_frame_size), dtype=float32)
+        self._mix_rows: list[NDArray[float32]] = []  # 混音矩阵各行 (帧数, 1) 形状的视图，供 FIFO 直接读入
+        self._mix_gains: NDArray[float32] = zeros(0, dtype=float32)
+        self._allocate_mix_matrix(opus_decoder_pool_capacity)
+        self._mix_out: NDArray[float32] = zeros(default_frame_size, dtype=float32)
+        self._mix_out_frames: NDArray[float32] = self._mix_out.reshape(-1, 1)
+        self._decode_ahead = decode_ahead_size
+        self._max_backlog = config.audio.max_playout_backlog / 1000  # 每个发送方待播放音频的上限（秒）
+        self._catch_ups: dict[int, int] = {}  # 各 transmitter 因积压超限丢帧追赶的次数
+        self._conflict_tone = ToneLoopReader(ToneCache())
         self._frame_size = 0
         self._channel = 1
         self._sample_rate = default_sample_rate
         self._stream: Optional[Stream] = None
+        self._plc_frames = 0
+        self._fec_frames = 0
+        self._cng_frames = 0
+        self._received_frames = 0
+        self._lost_frames = 0  # 抖动缓冲判定为丢包（序号间隙）的帧，含经 FEC 恢复的帧
+        self._decoded_frames = 0
+        self._decode_time = 0.0
+        self._decode_time_max = 0.0
 
     @property
     def frame_size(self) -> int:
         return self._frame_size
 
+    @property
+    def decoder_pool(self) -> OpusDecoderPool:
+        return self._decoder_pool
+
+    @property
+    def jitter_stats(self) -> dict[str, dict[str, float]]:
+        """各发送方抖动缓冲的深度、迟到、丢弃等统计，以及时钟漂移补偿的偏差与增减样本数，键为 cid:transmitter。"""
+        with self._lock:
+            return {f"{cid}:{transmitter}": {**sender.jitter_buffer.stats,
+                                             "drift_ms": round(sender.drift.error * 1000, 2),
+                                             "drift_dropped": sender.drift.dropped,
+                                             "drift_inserted": sender.drift.inserted}
+                    for (cid, transmitter), sender in self._senders.items()}
+
+    @property
+    def catch_up_stats(self) -> dict[int, int]:
+        """各 transmitter 因待播放音频超过 max_playout_backlog 而丢弃最旧帧追赶的次数。"""
+        with self._lock:
+            return dict(self._catch_ups)
+
+    @property
+    def concealment_stats(self) -> dict[str, int]:
+        """无数据帧的补偿次数：plc 为解码器外推，fec 为从下一包的带内冗余恢复，cng 为 DTX 静音期的补偿（同样是 PLC）。"""
+        return {"plc": self._plc_frames, "fec": self._fec_frames, "cng": self._cng_frames}
+
+    @property
+    def link_stats(self) -> tuple[int, int]:
+        """
+        累计播放的 (正常帧数, 丢失帧数)，供自适应码率估计丢包率。丢失帧只计抖动缓冲按到达间隔判定丢失的帧
+        （含经 FEC 恢复的帧）；缓冲耗尽时的补偿（如每段发射结尾）不是丢包，不计入。
+        """
+        return self._received_frames, self._lost_frames
+
+    @property
+    def decode_stats(self) -> dict[str, float]:
+        """解码线程的解码帧数与单帧解码耗时（微秒）。"""
+        frames = self._decoded_frames
+        return {
+            "frames": frames,
+            "avg_us": round(self._decode_time / frames * 1e6, 1) if frames else 0.0,
+            "max_us": round(self._decode_time_max * 1e6, 1),
+        }
+
+    def update_decoder_pool(self, args: SteamArgs) -> None:
+        """输出参数变化时更新解码器池；解码线程只在持锁时使用解码器池。"""
+        with self._lock:
+            self._decoder_pool.update(args)
+
+    @property
+    def transmitters(self) -> frozenset[int]:
+        """允许在本设备上播放的发射机。"""
+        with self._lock:
+            return frozenset(self._transmitters)
+
     def add_transmitter(self, transmitter_id: int) -> None:
-        """为该发射机分配一路队列。"""
-        if transmitter_id not in self._transmitter_queues:
-            self._transmitter_queues[transmitter_id] = Queue()
+        """允许该发射机在本设备上播放。"""
+        with self._lock:
+            self._transmitters.add(transmitter_id)
 
     def remove_transmitter(self, transmitter_id: int) -> None:
-        """移除该发射机的队列（切换输出设备时用）。"""
-        self._transmitter_queues.pop(transmitter_id, None)
+        """移除该发射机及其全部发送方的缓冲（切换输出设备时用）。"""
+        with self._lock:
+            self._transmitters.discard(transmitter_id)
+            for key in [key for key, sender in self._senders.items() if sender.transmitter_id == transmitter_id]:
+                del self._senders[key]
+            self._senders_changed()
 
     def enqueue_conflict_wave(self, wave: NDArray[float32]) -> None:
-        if not self._active or self._frame_size <= 0 or wave.size == 0:
+        conflict = self._conflict
+        if not self._active or conflict is None or wave.size == 0:
             return
-        try:
-            self._conflict_queue.put_nowait(wave.astype(float32))
-        except Full:
-            logger.debug("MixedOutputAudioStream > mixed output conflict queue full, dropping")
+        with self._conflict_lock:
+            if conflict.write(wave.reshape(-1, 1)) < wave.size:
+                logger.debug("MixedOutputAudioStream > mixed output conflict buffer full, dropping")
 
-    def play_encoded_audio(self, transmitter_id: int, encoded_data: bytes,
+    def play_encoded_audio(self, transmitter_id: int, sender: SenderKey, encoded_data: bytes,
                            conflict: bool = False, volume: float = 1.0) -> None:
-        """将一帧数据送入对应 transmitter 队列；冲突时生成冲突音送入冲突队列。"""
+        """将一帧数据送入对应发送方的抖动缓冲；冲突时生成冲突音写入冲突缓冲。"""
         if not self._active or self._frame_size <= 0:
             return
         if conflict:
-            try:
-                frame = self._generator.generate_frame(self._frame_size) * volume
-                self._conflict_queue.put_nowait(frame.astype(float32))
-            except Full:
-                logger.debug("MixedOutputAudioStream > mixed output conflict queue full, dropping")
+            for wave in self._conflict_tone.next(conflict_tone_frequency, self._sample_rate,
+                                                 tone_amplitude * volume, self._frame_size // self._channel):
+                self.enqueue_conflict_wave(wave)
             return
-        if transmitter_id not in self._transmitter_queues:
-            logger.trace(f"MixedOutputAudioStream > transmitter {transmitter_id} not in queue, dropping")
+        with self._lock:
+            if transmitter_id not in self._transmitters:
+                logger.trace(f"MixedOutputAudioStream > transmitter {transmitter_id} not in queue, dropping")
+                return
+            stream = self._senders.get(sender)
+            if stream is None or stream.transmitter_id != transmitter_id:
+                # 解码线程在 FIFO 不足 _decode_ahead 时才解码一个包，一个包最长 opus_max_frame_size
+                stream = _SenderStream(transmitter_id, AudioRingBuffer(self._decode_ahead + opus_max_frame_size))
+                self._senders[sender] = stream
+                self._senders_changed()
+            stream.volume = volume
+            stream.jitter_buffer.put(encoded_data)
+
+    def _senders_changed(self) -> None:
+        """发送方增删后重建回调遍历的快照，持锁调用。"""
+        self._mix_senders = tuple(self._senders.values())
+
+    def _fill_sender(self, sender: SenderKey, stream: _SenderStream, frame_count: int, now: float) -> bool:
+        """
+        从抖动缓冲取帧解码，直到 FIFO 中至少有 frame_count 帧；返回发送方是否仍在发送。
+        抖动缓冲已空但 FIFO 仍够下一次混音时先不补偿，下一个包可能在下次混音前到达；
+        但因缓冲耗尽补偿过之后照常补齐，直到再解码出正常帧，否则之后的包总在补偿之后才到达、被当作迟到包丢弃。
+        """
+        while stream.fifo.available < frame_count:
+            if (stream.jitter_buffer.depth == 0 and not stream.starved
+                    and stream.fifo.available >= self._mix_frame_size):
+                break
+            # 缓冲非空时取出的 LOST 是丢包占位，缓冲为空时的 LOST 只是缓冲耗尽后的补偿
+            queued = stream.jitter_buffer.depth > 0
+            status, payload = stream.jitter_buffer.get(now)
+            if status == FrameStatus.SILENCE:
+                return False
+            start = perf_counter()
+            decoder = self._decoder_pool.get(sender)
+            if status == FrameStatus.LOST:
+                if queued:
+                    self._lost_frames += 1
+                # 下一个包已在缓冲中时用其带内 FEC 恢复丢失帧，否则由解码器做丢包补偿（PLC）
+                next_payload = stream.jitter_buffer.peek()
+                if next_payload is not None:
+                    self._fec_frames += 1
+                    audio_data = decoder.decode(next_payload, fec=True)
+                else:
+                    self._plc_frames += 1
+                    stream.starved = stream.jitter_buffer.depth == 0
+                    audio_data = decoder.decode(None)
+                if audio_data is None or audio_data.size == 0:
+                    # 补偿失败时以静音占位，保持时间轴连续
+                    audio_data = zeros(decoder.last_frame_size, dtype=float32)
+            elif status == FrameStatus.COMFORT:
+                # DTX 静音期：由解码器做丢包补偿（PLC）填补空档，并非 Opus 的舒适噪声生成（CNG）。
+                # libopus 对只含 TOC 的 DTX 包本身也按 PLC 解码，把 DTX 包送入解码器结果相同
+                self._cng_frames += 1
+                audio_data = decoder.decode(None)
+                if audio_data is None or audio_data.size == 0:
+                    audio_data = zeros(decoder.last_frame_size, dtype=float32)
+            else:
+                stream.starved = False
+                self._received_frames += 1
+                audio_data = decoder.decode(payload)
+            elapsed = perf_counter() - start
+            self._decoded_frames += 1
+            self._decode_time += elapsed
+            self._decode_time_max = max(self._decode_time_max, elapsed)
+            if audio_data is None or audio_data.size == 0:
+                continue
+            frame = audio_data.reshape(-1, 1)
+            adjusted = stream.drift.apply(frame)
+            if adjusted.shape[0] != frame.shape[0]:
+                # 漂移补偿增减的样本同样顺延或提前该发送方之后各帧的播放时刻，迟到判定随之调整
+                stream.jitter_buffer.shift_schedule((adjusted.shape[0] - frame.shape[0]) / opus_default_sample_rate)
+            stream.fifo.write(adjusted)
+        return True
+
+    def _cap_backlog(self, stream: _SenderStream) -> None:
+        """
+        发送方待播放的音频（抖动缓冲中的帧与 FIFO 中已解码的样本）超过上限时，丢弃抖动缓冲中最旧的帧，
+        使待播放的音频回到目标深度，避免网络卡顿后突发到达的一批包让之后的整段发射都延迟播放。
+        """
+        jitter_buffer = stream.jitter_buffer
+        if jitter_buffer.depth <= jitter_buffer.target_depth:
             return
-        audio_data = self._decoder.decode(encoded_data)
-        if audio_data is None:
+        frame_time = jitter_buffer.frame_time
+        decoded = stream.fifo.available / opus_default_sample_rate
+        backlog = jitter_buffer.depth * frame_time + decoded
+        if backlog <= self._max_backlog:
             return
-        for frame in _resample_to_output(audio_data, self._sample_rate, self._frame_size, volume):
-            try:
-                self._transmitter_queues[transmitter_id].put_nowait(frame)
-            except Full:
-                logger.debug(f"MixedOutputAudioStream >  transmitter {transmitter_id} queue full, dropping frame")
-
-    def _get_conflict_audio(self, frame_count: int) -> tuple[NDArray[float32], bool]:
-        """取一帧冲突音，不足或超出 frame_count 时补零或截断。"""
-        try:
-            data = self._conflict_queue.get_nowait()
-            n = data.size
-            if n != frame_count:
-                logger.warning(
-                    f"MixedOutputAudioStream > conflict audio size mismatch, expect {frame_count} but got {n}"
-                )
-                if n >= frame_count:
-                    data = data[:frame_count].astype(float32)
-                else:
-                    out = zeros(frame_count, dtype=float32)
-                    out[:n] = data.astype(float32)
-                    data = out
-            return data, True
-        except Empty:
-            return zeros(0, dtype=float32), False
-
-    def _mix_one_frame(self, frame_count: int) -> NDArray[float32]:
-        """多路叠加后经 tanh 软限幅；每路帧与 frame_count 不一致时截断或补零。"""
-        mixed = zeros(frame_count, dtype=float32)
-        for q in self._transmitter_queues.values():
-            try:
-                frame = q.get_nowait()
-                n = frame.size
-                if n != frame_count:
-                    logger.warning(
-                        f"MixedOutputAudioStream > transmitter frame size mismatch, expect {frame_count} but got {n}"
-                    )
-                if n >= frame_count:
-                    mixed += frame[:frame_count]
-                elif n > 0:
-                    mixed[:n] += frame.astype(float32)
-            except Empty:
-                pass
-        return tanh(mixed).astype(float32)
+        # FIFO 中已解码的音频也算在目标深度内
+        dropped = jitter_buffer.drop_oldest(max(jitter_buffer.target_depth - int(decoded / frame_time), 0))
+        # 缓冲水平已突变，漂移补偿重新建立基准
+        stream.drift.reset()
+        self._catch_ups[stream.transmitter_id] = self._catch_ups.get(stream.transmitter_id, 0) + 1
+        logger.trace(f"MixedOutputAudioStream > transmitter {stream.transmitter_id} backlog "
+                     f"{backlog * 1000:.0f} ms exceeds limit, dropped {dropped} oldest frames")
+
+    @staticmethod
+    def _track_drift(stream: _SenderStream, now: float) -> None:
+        """
+        在解码补齐之前测量发送方缓冲的音频总时长：抖动缓冲中的帧、FIFO 中已解码的样本，
+        加上距上一个包到达的时间（发送方正在生成的下一帧），使测量值随时间连续变化而不是按整帧跳变。
+        收发两端时钟一致时总时长围绕开始播放时的水平波动，不一致时持续偏离；
+        未在播放、DTX 静音期或刚因缓冲耗尽补偿过时重新建立基准。
+        """
+        jitter_buffer = stream.jitter_buffer
+        if not jitter_buffer.playing or jitter_buffer.dtx or stream.starved:
+            stream.drift.reset()
+            return
+        frame_time = jitter_buffer.frame_time
+        buffered = (jitter_buffer.depth * frame_time + stream.fifo.available / opus_default_sample_rate
+                    + min(max(now - jitter_buffer.last_arrival, 0.0), frame_time))
+        stream.drift.update(buffered)
+
+    def decode_pending(self) -> None:
+        """
+        由解码线程调用：为每个发送方解码到 FIFO 中至少有 decode_ahead_size（且不少于一次混音）帧。
+        播放回调每消耗一帧，这里才从抖动缓冲再取一帧，保持抖动缓冲按播放节奏出帧；长时间无数据的发送方被移除。
+        """
+        if not self._active:
+            return
+        now = monotonic()
+        with self._lock:
+            for sender, stream in list(self._senders.items()):
+                self._cap_backlog(stream)
+                self._track_drift(stream, now)
+                stream.sending = self._fill_sender(sender, stream, self._decode_ahead, now)
+                if stream.fifo.available == 0 and stream.jitter_buffer.expired(now, opus_decoder_idle_timeout):
+                    del self._senders[sender]
+                    self._senders_changed()
+
+    def _mix_one_frame(self) -> NDArray[float32]:
+        """
+        以 Opus 采样率从每个发送方的 FIFO 切出一个混音帧（_mix_frame_size 帧）读入混音矩阵的一行，
+        音量向量与矩阵相乘得到混音结果，原地 tanh 软限幅后输出 (帧数, 1)；返回的是复用缓冲，需立即使用。
+        发送方停止发送后取出 FIFO 中剩余样本并补零；仍在发送但解码线程尚未跟上的发送方本帧跳过。
+        """
+        frame_count = self._mix_frame_size
+        rows = 0
+        # 发送方字典可能正被收包/解码线程修改，回调只遍历其快照，不加锁
+        for stream in self._mix_senders:
+            n = min(stream.fifo.available, frame_count)
+            if n == 0 or (n < frame_count and stream.sending):
+                continue
+            if rows == len(self._mix_rows):
+                self._grow_mix_matrix()
+            row = self._mix_rows[rows]
+            stream.fifo.read_into(row)
+            if n < frame_count:
+                row[n:] = 0
+            self._mix_gains[rows] = stream.volume
+            rows += 1
+        out = self._mix_out
+        if rows == 0:
+            # 没有可混音的数据，输出静音，无需 tanh
+            out.fill(0)
+        else:
+            dot(self._mix_gains[:rows], self._mix_matrix[:rows], out=out)
+            tanh(out, out=out)
+        return self._mix_out_frames
+
+    def _allocate_mix_matrix(self, rows: int) -> None:
+        """按行数与混音帧长分配混音矩阵及其各行的视图，已有的音量保留。"""
+        self._mix_matrix = zeros((rows, self._mix_frame_size), dtype=float32)
+        self._mix_rows = [row.reshape(-1, 1) for row in self._mix_matrix]
+        gains = zeros(rows, dtype=float32)
+        kept = min(rows, self._mix_gains.size)
+        gains[:kept] = self._mix_gains[:kept]
+        self._mix_gains = gains
+
+    def _grow_mix_matrix(self) -> None:
+        """发送方数超过混音矩阵行数时扩容为两倍，本帧已读入的行随之保留。"""
+        matrix = self._mix_matrix
+        self._allocate_mix_matrix(matrix.shape[0] * 2)
+        self._mix_matrix[:matrix.shape[0]] = matrix
 
     def _callback(self, _, frame_count: int, __, ___) -> tuple[bytes, int]:
         # PyAudio 的 frame_count 为帧数，每帧含 channel 个样本，需返回 frame_count * channel 个样本
-        sample_count = frame_count * self._channel
-        data, has_conflict = self._get_conflict_audio(sample_count)
-        if has_conflict:
-            return data.tobytes(), paContinue
-        mixed = self._mix_one_frame(sample_count)
-        return mixed.tobytes(), paContinue
+        out = self._output_buffer(frame_count)
+        conflict = self._conflict
+        if conflict is not None and conflict.available > 0:
+            n = conflict.read_into(self._mono_frames)
+            if n < frame_count:
+                out[n:] = 0
+            return self._device_output(), paContinue
+        output = self._output_resampler
+        if output is None:
+            out[:] = 0
+            return self._device_output(), paContinue
+        # 按 Opus 帧混音并送入设备重采样器，直接读入输出缓冲，直到填满一个设备帧
+        frames = self._mono_frames
+        filled = output.pull_into(frames)
+        while filled < frame_count:
+            output.push(self._mix_one_frame())
+            filled += output.pull_into(frames[filled:])
+        self._decode_worker.wake()
+        return self._device_output(), paContinue
+
+    def _prepare(self, args: SteamArgs):
+        self._frame_size = args.frame_size
+        self._channel = args.channel
+        self._sample_rate = args.sample_rate
+        self._output_buffer(args.frame_size // args.channel)
+        self._output_resampler = StreamResampler(opus_default_sample_rate, args.sample_rate, 1, float32)
+        self._conflict = AudioRingBuffer(int(args.sample_rate * audio_ring_buffer_time))
+        self._mix_frame_size = args.opus_frame_size
+        self._decode_ahead = max(decode_ahead_size, self._mix_frame_size)
+        self._max_backlog = config.audio.max_playout_backlog / 1000
+        self._allocate_mix_matrix(self._mix_matrix.shape[0])
+        self._mix_out = zeros(self._mix_frame_size, dtype=float32)
+        self._mix_out_frames = self._mix_out.reshape(-1, 1)
+        with self._lock:
+            # 混音帧长可能已变化，丢弃按旧参数缓存的发送方状态
+            self._senders.clear()
+            self._senders_changed()
 
     def start(self, args: SteamArgs):
         if self._active:
             return
-        self._generator.update_sample_rate(args.sample_rate)
-        self._frame_size = args.frame_size
-        self._channel = args.channel
-        self._sample_rate = args.sample_rate
+        self._prepare(args)
         try:
             self._stream = self._audio.open(
                 format=paFloat32,
@@ -417,7 +913,14 @@ class MixedOutputAudioStream(AudioStream):
                 pass
             self._stream = None
         self._active = False
-        self._transmitter_queues.clear()
+        self._output_resampler = None
+        self._conflict = None
+        with self._lock:
+            # 保留已登记的 transmitter，切换设备重启后无需重新添加
+            self._senders.clear()
+            self._senders_changed()
+            # 解码线程只在持锁时使用解码器池
+            self._decoder_pool.clear()
         logger.debug("MixedOutputAudioStream > stopped mixed audio playback")
 
     def restart(self, args: SteamArgs):
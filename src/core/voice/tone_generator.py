@@ -1,81 +1,157 @@
 #  Copyright (c) 2026 Half_nothing
 #  SPDX-License-Identifier: MIT
-"""正弦波生成器：用于 PTT 提示音、冲突音等固定频率短音。"""
+"""正弦波生成器：用于 PTT 提示音、冲突音等固定频率短音，以及渲染好的提示音缓存。"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
 
-from numpy import arange, float32, pi, sin, zeros
+from numpy import arange, argmin, cos, empty, float32, float64, maximum, pi, repeat, rint, sin
 from numpy.typing import NDArray
 
+from src.constants import tone_cache_capacity, tone_fade_time
+
+# 单周期正弦波表，末尾多存一个点，线性插值时无需回绕
+_table_size = 4096
+_wavetable: NDArray[float32] = sin(2 * pi * arange(_table_size + 1) / _table_size).astype(float32)
+
 
 class ToneGenerator:
-    """正弦波生成器：预计算单周期波形，按帧输出，支持动态改频率/采样率/振幅。"""
+    """
+    波表正弦振荡器：相位以波表点为单位、按小数累加，查表时线性插值，
+    任意频率/采样率下音高准确，帧与帧之间相位连续。支持动态改频率/采样率/振幅。
+    """
 
     def __init__(self, sample_rate: int = 44100, frequency: float = 293.66, amplitude: float = 0.3):
         self.sample_rate = sample_rate
         self.frequency = frequency
         self.amplitude = amplitude
-        self.phase_increment: float = 0.0
-        self.samples_per_cycle = 0
-        self.cycle_waveform: NDArray[float32] = zeros(0, dtype=float32)
-        self.phase_pointer = 0
-        self._precalculate_waveform()
-
-    def update_frequency(self, frequency: float):
-        self.frequency = frequency
-        self._precalculate_waveform()
-
-    def update_amplitude(self, amplitude: float):
-        self.amplitude = amplitude
-        self._precalculate_waveform()
-
-    def update_sample_rate(self, sample_rate: int):
-        self.sample_rate = sample_rate
-        self._precalculate_waveform()
+        self.phase: float = 0.0  # 当前相位，[0, _table_size)
+        self.phase_increment: float = 0.0  # 每个样本前进的波表点数
+        self._update_phase_increment()
 
     def update_arguments(self, sample_rate: int = 44100, frequency: float = 293.66, amplitude: float = 0.3):
         self.sample_rate = sample_rate
         self.frequency = frequency
         self.amplitude = amplitude
-        self._precalculate_waveform()
-
-    def _precalculate_waveform(self):
-        # 预计算一个周期的波形
-        self.phase_increment = 2 * pi * self.frequency / self.sample_rate
-        self.samples_per_cycle = int(self.sample_rate / self.frequency)
-
-        # 预计算一个完整周期的正弦波
-        n = arange(self.samples_per_cycle) * self.phase_increment
-        self.cycle_waveform = self.amplitude * sin(n).astype(float32)
-
-        # 相位指针（在预计算波形中的位置）
-        self.phase_pointer = 0
-
-    def generate_frame(self, frame_size: int) -> NDArray[float32]:
-        frame = zeros(frame_size, dtype=float32)
-
-        # 从预计算波形中复制数据
-        remaining = frame_size
-        dest_pos = 0
-
-        while remaining > 0:
-            # 计算可以从当前相位指针复制的数量
-            available = self.samples_per_cycle - self.phase_pointer
+        self._update_phase_increment()
+
+    def _update_phase_increment(self):
+        self.phase_increment = _table_size * self.frequency / self.sample_rate
+
+    def generate_frame(self, frame_size: int, out: Optional[NDArray[float32]] = None) -> NDArray[float32]:
+        """生成 frame_size 个样本，给出 out 时写入 out 并返回它。"""
+        frame = empty(frame_size, dtype=float32) if out is None else out[:frame_size]
+        positions = self.phase + arange(frame_size, dtype=float64) * self.phase_increment
+        positions %= _table_size
+        index = positions.astype(int)
+        fraction = (positions - index).astype(float32)
+        left = _wavetable[index]
+        frame[:] = (left + (_wavetable[index + 1] - left) * fraction) * self.amplitude
+        self.phase = (self.phase + frame_size * self.phase_increment) % _table_size
+        return frame
 
-            if available >= remaining:
-                # 可以一次复制完
-                frame[dest_pos:dest_pos + remaining] = self.cycle_waveform[
-                                                       self.phase_pointer:self.phase_pointer + remaining]
-                self.phase_pointer += remaining
-                break
+    def render(self, frame_count: int, channels: int = 1, fade_time: float = 0.0) -> NDArray[float32]:
+        """
+        从零相位渲染一段完整的单音，首尾各加 fade_time 秒的升余弦淡入淡出以免爆音；
+        多声道时各声道相同，返回交错排列的一维数组。
+        """
+        self.phase = 0.0
+        wave = self.generate_frame(frame_count)
+        fade = min(int(self.sample_rate * fade_time), frame_count // 2)
+        if fade > 0:
+            ramp = (0.5 - 0.5 * cos(pi * arange(fade) / fade)).astype(float32)
+            wave[:fade] *= ramp
+            wave[-fade:] *= ramp[::-1]
+        if channels > 1:
+            wave = repeat(wave, channels)
+        return wave
+
+
+def _loop_length(frequency: float, sample_rate: int) -> tuple[int, int]:
+    """在半秒到一秒之间选取恰含整数个周期、且与目标频率偏差最小的循环长度，返回 (样本数, 周期数)。"""
+    lengths = arange(sample_rate // 2, sample_rate + 1)
+    cycles = maximum(rint(lengths * frequency / sample_rate), 1)
+    best = int(argmin(abs(cycles * sample_rate / lengths - frequency)))
+    return int(lengths[best]), int(cycles[best])
+
+
+type _ToneKey = tuple[bool, float, int, float, int, int]
+
+
+class ToneCache:
+    """
+    渲染好的提示音/冲突音缓存，键为 (是否循环, 频率, 采样率, 振幅, 帧数, 声道数)，按 LRU 淘汰；循环音的帧数记为 0。
+    返回的数组只读且被多次复用，调用方只能读取（如写入冲突缓冲）。可在多个线程中调用。
+    """
+
+    def __init__(self, capacity: int = tone_cache_capacity):
+        self._capacity = capacity
+        self._entries: OrderedDict[_ToneKey, NDArray[float32]] = OrderedDict()
+        self._lock = Lock()
+        self._generator = ToneGenerator()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, loop: bool, frequency: float, sample_rate: int, amplitude: float,
+             frame_count: int, channels: int) -> NDArray[float32]:
+        key = (loop, frequency, sample_rate, round(amplitude, 3), frame_count, channels)
+        with self._lock:
+            wave = self._entries.get(key)
+            if wave is not None:
+                self._entries.move_to_end(key)
+                return wave
+            if loop:
+                # 取整数个周期，缓冲首尾相接重复播放时相位连续，无需淡入淡出；
+                # 循环长度在半秒以上，取整带来的频率偏差远小于可闻的音高差
+                length, cycles = _loop_length(frequency, sample_rate)
+                self._generator.update_arguments(sample_rate, cycles * sample_rate / length, key[3])
+                wave = self._generator.render(length, channels)
             else:
-                # 复制当前周期剩余部分
-                frame[dest_pos:dest_pos + available] = self.cycle_waveform[
-                                                       self.phase_pointer:self.phase_pointer + available]
-                dest_pos += available
-                remaining -= available
-                # 重置相位指针到周期开始
-                self.phase_pointer = 0
-
-        # 确保相位指针在有效范围内
-        self.phase_pointer %= self.samples_per_cycle
-
-        return frame
+                self._generator.update_arguments(sample_rate, frequency, key[3])
+                wave = self._generator.render(frame_count, channels, tone_fade_time)
+            wave.flags.writeable = False
+            self._entries[key] = wave
+            if len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+            return wave
+
+    def beep(self, frequency: float, sample_rate: int, amplitude: float,
+             frame_count: int, channels: int = 1) -> NDArray[float32]:
+        """一段带淡入淡出的提示音（如 PTT 按下/松开），音高精确。"""
+        return self._get(False, frequency, sample_rate, amplitude, frame_count, channels)
+
+    def loop(self, frequency: float, sample_rate: int, amplitude: float, channels: int = 1) -> NDArray[float32]:
+        """一段可首尾相接无缝重复的音（半秒到一秒，恰为整数个周期），由 ToneLoopReader 按帧连续读出。"""
+        return self._get(True, frequency, sample_rate, amplitude, 0, channels)
+
+    def discard(self, frequency: Optional[float] = None, sample_rate: Optional[int] = None) -> None:
+        """丢弃与给定频率和/或采样率匹配的缓存项，其余缓存项不受影响。"""
+        with self._lock:
+            for key in [key for key in self._entries
+                        if (frequency is None or key[1] == frequency)
+                        and (sample_rate is None or key[2] == sample_rate)]:
+                del self._entries[key]
+
+
+class ToneLoopReader:
+    """
+    按帧连续读出 ToneCache 中的循环音（如冲突音），跨帧保留读位置，帧与帧之间相位连续。
+    振幅变化时循环长度不变，读位置照常延续；频率或采样率变化时读位置按新的循环长度取模。
+    """
+
+    def __init__(self, cache: ToneCache):
+        self._cache = cache
+        self._offset = 0
+
+    def next(self, frequency: float, sample_rate: int, amplitude: float,
+             frame_count: int) -> tuple[NDArray[float32], NDArray[float32]]:
+        """取出接下来的 frame_count 个单声道样本；跨越循环末尾时分两段返回，不跨越时第二段为空。"""
+        wave = self._cache.loop(frequency, sample_rate, amplitude)
+        frame_count = min(frame_count, wave.size)
+        start = self._offset % wave.size
+        end = start + frame_count
+        self._offset = end % wave.size
+        if end <= wave.size:
+            return wave[start:end], wave[:0]
+        return wave[start:], wave[:end - wave.size]
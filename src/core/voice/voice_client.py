@@ -6,10 +6,10 @@
 """
 from time import time
 
-from PySide6.QtCore import QObject
+from PySide6.QtCore import QObject, QTimer
 from loguru import logger
 
-from src.constants import default_frame_time_s
+from src.constants import voice_activity_interval, voice_activity_timeout
 from src.model import ClientInfo, ConnectionState, ControlMessage, MessageType, UserLoginModel, VoicePacket, \
     VoicePacketBuilder
 from src.signal import AudioClientSignals
@@ -33,15 +33,23 @@ class VoiceClient(QObject):
         self._transmitters: dict[int, Transmitter] = {}  # id -> transmitter
         self._transmitters_by_frequency: dict[int, Transmitter] = {}  # frequency -> transmitter（后端限制同用户同频仅一台）
         self._last_receive: dict[int, tuple[str, float]] = {}  # frequency -> (callsign, time)
+        self._receiving: dict[str, tuple[int, float]] = {}  # callsign -> (frequency, time)，收包线程写入
+        self._voice_activity: dict[str, int] = {}  # 上次通知 UI 的 callsign -> frequency
         self._current_transmitter_id = -1
         self._sending = False
 
         self._audio.on_encoded_audio = self._send_voice_data
         self.signals.control_message_received.connect(self._handle_control_message)
-        self.signals.voice_data_received.connect(self._handle_voice_packet)
+        # 语音包在收包线程直接路由到音频缓冲，不经过 Qt 信号与主线程的事件循环
+        self._network.voice_packet_handler = self._handle_voice_packet
         self.signals.socket_connection_state.connect(self._handle_connection_status)
         self.signals.ptt_status_change.connect(self.ptt_state)
 
+        # UI 只按显示节奏接收「正在收听谁」的汇总，而不是逐包通知；仅在连接期间运行
+        self._voice_activity_timer = QTimer()
+        self._voice_activity_timer.timeout.connect(self._update_voice_activity)
+        self._voice_activity_timer.setInterval(voice_activity_interval)
+
     def ptt_state(self, state: bool):
         self._sending = state
 
@@ -63,6 +71,7 @@ class VoiceClient(QObject):
 
     def disconnect_from_server(self):
         self._network.disconnect_from_server()
+        self._stop_voice_activity()
         self._current_transmitter_id = -1
         self._audio.cleanup()
         self._transmitters.clear()
@@ -156,7 +165,12 @@ class VoiceClient(QObject):
             logger.error(f"VoiceClient > server error: {message.data}")
             self.signals.error_occurred.emit(message.data)
         elif message.type == MessageType.PONG:
-            logger.debug("VoiceClient > received pong from server")
+            rtt = self._network.pong_received()
+            if rtt is None:
+                logger.debug("VoiceClient > received pong from server")
+                return
+            logger.debug(f"VoiceClient > received pong from server, rtt {rtt * 1000:.1f} ms")
+            self._audio.report_rtt(rtt)
         elif message.type == MessageType.MESSAGE:
             if message.data.startswith("SERVER:"):
                 if "Welcome" in message.data:
@@ -172,34 +186,63 @@ class VoiceClient(QObject):
             self.clear()
             self._set_connection_state(ConnectionState.DISCONNECTED)
 
+    def _update_voice_activity(self):
+        """按显示节奏汇总正在收听的呼号与频率，有变化时通知 UI（最近发言者排在最后）。"""
+        now = time()
+        receiving = sorted(list(self._receiving.items()), key=lambda item: item[1][1])
+        activity: dict[str, int] = {}
+        for callsign, (frequency, last_time) in receiving:
+            if now - last_time < voice_activity_timeout:
+                activity[callsign] = frequency
+            else:
+                self._receiving.pop(callsign, None)
+        if list(activity.items()) != list(self._voice_activity.items()):
+            self._voice_activity = activity
+            self.signals.voice_activity_changed.emit(activity)
+
+    def _stop_voice_activity(self):
+        """断开连接时停止汇总，并清空 UI 上仍显示的收听状态。"""
+        self._voice_activity_timer.stop()
+        self._receiving.clear()
+        if self._voice_activity:
+            self._voice_activity = {}
+            self.signals.voice_activity_changed.emit({})
+
     def _handle_voice_packet(self, packet: VoicePacket):
+        """在 UDP 收包线程调用：冲突判定后直接送入音频缓冲。"""
+        now = time()
+        self._receiving[packet.callsign] = (packet.frequency, now)
         conflict = False
         last_receive = self._last_receive.get(packet.frequency, None)
         if self._sending or (last_receive is not None
-                             and time() - last_receive[1] < default_frame_time_s * 5
+                             and now - last_receive[1] < self._audio.frame_time / 1000 * 5
                              and last_receive[0] != packet.callsign):
             # 如果同时在发送, 或者5个音频帧内收到了多个发送者发来的数据, 则判定为冲突
             conflict = True
         else:
-            self._last_receive[packet.frequency] = (packet.callsign, time())
+            self._last_receive[packet.frequency] = (packet.callsign, now)
         # 服务端转发的是发送方原始数据，packet.transmitter 是发送方 id；用频率索引 O(1) 查找本机 transmitter
         transmitter = self._transmitters_by_frequency.get(packet.frequency)
         if transmitter is None:
             return
-        self._audio.play_encoded_audio(transmitter, packet.data, conflict)
+        self._audio.play_encoded_audio(transmitter, packet, conflict)
 
     def _handle_connection_status(self, connected: bool):
         if connected:
+            self._voice_activity_timer.start()
             self._set_connection_state(ConnectionState.CONNECTED)
         else:
+            self._stop_voice_activity()
             self._set_connection_state(ConnectionState.DISCONNECTED)
 
     def clear(self):
         self._transmitters.clear()
         self._transmitters_by_frequency.clear()
+        self._stop_voice_activity()
         self._audio.cleanup()
         self._network.disconnect_from_server()
 
     def shutdown(self):
+        self._voice_activity_timer.stop()
         self._network.shutdown()
         self._audio.shutdown()
@@ -3,7 +3,7 @@
 
 from PySide6.QtCore import QObject, Signal
 
-from src.model import ConnectionState, ControlMessage, DeviceInfo, VoicePacket, WebSocketMessage
+from src.model import ConnectionState, ControlMessage, DeviceInfo, WebSocketMessage
 
 
 class AudioClientSignals(QObject):
@@ -26,8 +26,9 @@ class AudioClientSignals(QObject):
     connection_state_changed = Signal(ConnectionState)
     # emit when receive control message
     control_message_received = Signal(ControlMessage)
-    # emit when receive voice data
-    voice_data_received = Signal(VoicePacket)
+    # emit at display rate when the set of stations being received changes
+    # arguments: callsign -> frequency, the most recent speaker last
+    voice_activity_changed = Signal(dict)
     # emit when send voice data
     voice_data_sent = Signal()
     # emit when receive error
@@ -42,6 +43,11 @@ class AudioClientSignals(QObject):
 
     # emit when test audio device; (state, target) target is "headphone" or "speaker"
     test_audio_device = Signal(bool, str)
+    # emit when device test monitor mode changed; mode is "直接监听" or "编码后"
+    device_test_mode_changed = Signal(str)
+    # emit periodically during device test with the latest round-trip latency of each mode
+    # arguments: mode -> latency in ms (-1 if not measured yet)
+    device_test_latency_changed = Signal(dict)
     # emit when microphone gain changed
     microphone_gain_changed = Signal(int)
 
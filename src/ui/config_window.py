@@ -57,6 +57,13 @@ class ConfigWindow(FramelessWidget, Ui_ConfigWindow):
         for combo in (self.combo_box_ptt_play_device, self.combo_box_conflict_play_device):
             if combo.count() == 0:
                 combo.addItems(["耳机", "扬声器"])
+        if self.combo_box_device_test_mode.count() == 0:
+            self.combo_box_device_test_mode.addItems(["直接监听", "编码后"])
+        self.combo_box_device_test_mode.setCurrentText(
+            config.audio.device_test_mode if config.audio.device_test_mode in ("直接监听", "编码后") else "直接监听"
+        )
+        self.combo_box_device_test_mode.currentTextChanged.connect(self.device_test_mode_change)
+        self.signals.device_test_latency_changed.connect(self.device_test_latency_change)
         self.signals.connection_state_changed.connect(
             self.handle_connect_status_change, Qt.ConnectionType.QueuedConnection
         )
@@ -98,6 +105,16 @@ class ConfigWindow(FramelessWidget, Ui_ConfigWindow):
         self.signals.test_audio_device.emit(active, "conflict")
         self._update_test_buttons_state()
 
+    def device_test_mode_change(self, value: str):
+        if not value:
+            return
+        self.signals.device_test_mode_changed.emit(value)
+
+    def device_test_latency_change(self, latency: dict):
+        self.label_device_test_latency.setText(
+            " / ".join(f"{mode} {value:.1f}ms" if value >= 0 else f"{mode} --" for mode, value in latency.items())
+        )
+
     def microphone_gain_change(self, value: int):
         self.label_microphone_gain.setText(f"{value}dB")
         self.signals.microphone_gain_changed.emit(value)
@@ -192,6 +209,9 @@ class ConfigWindow(FramelessWidget, Ui_ConfigWindow):
         self.combo_box_conflict_play_device.setCurrentText(
             config.audio.conflict_play_device if config.audio.conflict_play_device in ("耳机", "扬声器") else "耳机"
         )
+        self.combo_box_device_test_mode.setCurrentText(
+            config.audio.device_test_mode if config.audio.device_test_mode in ("直接监听", "编码后") else "直接监听"
+        )
 
         return True
 
@@ -217,6 +237,7 @@ class ConfigWindow(FramelessWidget, Ui_ConfigWindow):
         config.audio.ptt_play_device = self.combo_box_ptt_play_device.currentText()
         config.audio.conflict_volume = self.conflict_volume.value() / 100
         config.audio.conflict_play_device = self.combo_box_conflict_play_device.currentText()
+        config.audio.device_test_mode = self.combo_box_device_test_mode.currentText()
 
         config_manager.save()
         logger_init()
@@ -234,6 +255,7 @@ class ConfigWindow(FramelessWidget, Ui_ConfigWindow):
         self.signals.ptt_release_freq_changed.emit(config.audio.ptt_release_freq)
         self.signals.ptt_volume_changed.emit(config.audio.ptt_volume)
         self.signals.conflict_volume_changed.emit(config.audio.conflict_volume)
+        self.signals.device_test_mode_changed.emit(config.audio.device_test_mode)
 
     def handle_connect_status_change(self, status: ConnectionState) -> None:
         match status:
@@ -9,9 +9,9 @@ from PySide6.QtCore import Qt, QTimer
 from PySide6.QtWidgets import QMessageBox, QWidget
 
 from src.config import config
-from src.constants import default_frame_time, default_frame_time_s
+from src.constants import default_frame_time
 from src.core import VoiceClient, WebSocketBroadcastServer
-from src.model import ConnectionState, VoicePacket, WebSocketMessage
+from src.model import ConnectionState, WebSocketMessage
 from src.signal import AudioClientSignals
 from .client_window import ClientWindow
 from .controller_window import ControllerWindow
@@ -26,7 +26,7 @@ class ConnectWindow(QWidget, Ui_ConnectWindow):
         self.voice_client = voice_client
         self.signals = signals
         self.connected = False
-        self.active_transmitter: dict[str, tuple[float, int]] = {}
+        self.active_transmitter: dict[str, int] = {}  # callsign -> frequency (Hz)
         self.controller_window = ControllerWindow(signals, voice_client)
         self.client_window = ClientWindow(signals, voice_client)
         self.windows.addWidget(QWidget())
@@ -35,11 +35,6 @@ class ConnectWindow(QWidget, Ui_ConnectWindow):
         self.websocket = WebSocketBroadcastServer()
         signals.broadcast_message.connect(lambda msg: self.websocket.broadcast(msg))
 
-        self.receive_timeout_timer = QTimer()
-        self.receive_timeout_timer.timeout.connect(self.check_rx_timeout)
-        self.receive_timeout_timer.setInterval(default_frame_time // 4)
-        self.receive_timeout_timer.start()
-
         self.last_data_send: float = 0.0
         self.send_timeout_timer = QTimer()
         self.send_timeout_timer.timeout.connect(self.check_tx_timeout)
@@ -62,26 +57,15 @@ class ConnectWindow(QWidget, Ui_ConnectWindow):
         self.voice_client.signals.voice_data_sent.connect(
             self.tx_send, Qt.ConnectionType.QueuedConnection
         )
-        self.voice_client.signals.voice_data_received.connect(
-            self.rx_receive, Qt.ConnectionType.QueuedConnection
+        self.voice_client.signals.voice_activity_changed.connect(
+            self.rx_activity_changed, Qt.ConnectionType.QueuedConnection
         )
         self.signals.login_success.connect(self.login_success)
 
-    def check_rx_timeout(self):
-        current_time = time()
-        for transmitter, data in list(self.active_transmitter.items()):
-            if current_time - data[0] > default_frame_time_s * 4:
-                self.signals.broadcast_message.emit(WebSocketMessage.rx_end(transmitter, data[1]))
-                del self.active_transmitter[transmitter]
-        active = len(self.active_transmitter) > 0
-        self.button_rx.set_active(active)
-        if self.voice_client.client_info.is_atc:
-            self.controller_window.sub_window.button_rx.set_active(active)
-
     def check_tx_timeout(self):
         if not self.button_tx.is_active:
             return
-        if time() - self.last_data_send < default_frame_time_s * 4:
+        if time() - self.last_data_send < self.voice_client.audio.frame_time / 1000 * 4:
             return
         self.button_tx.set_active(False)
         if self.voice_client.client_info.is_atc:
@@ -97,22 +81,31 @@ class ConnectWindow(QWidget, Ui_ConnectWindow):
         if self.voice_client.client_info.is_atc:
             self.controller_window.sub_window.button_tx.set_active(True)
 
-    def rx_receive(self, voice: VoicePacket) -> None:
+    def rx_activity_changed(self, activity: dict[str, int]) -> None:
+        for callsign, frequency in list(self.active_transmitter.items()):
+            if callsign not in activity:
+                self.signals.broadcast_message.emit(WebSocketMessage.rx_end(callsign, frequency))
+                del self.active_transmitter[callsign]
         if self.voice_client.connection_state != ConnectionState.READY:
             self.button_rx.set_active(False)
             self.controller_window.sub_window.button_rx.set_active(False)
             return
-        if self.active_transmitter.get(voice.callsign, None) is None:
-            self.signals.broadcast_message.emit(
-                WebSocketMessage.rx_begin(voice.callsign, voice.frequency * 1000)
-            )
-        self.active_transmitter[voice.callsign] = (time(), voice.frequency * 1000)
-        self.button_rx.set_active(True)
-        self.label_rx_callsign_v.setText(voice.callsign)
-        self.label_rx_freq_v.setText(f"{voice.frequency / 1000:.3f}")
+        for callsign, frequency in activity.items():
+            if callsign not in self.active_transmitter:
+                self.signals.broadcast_message.emit(WebSocketMessage.rx_begin(callsign, frequency * 1000))
+                self.active_transmitter[callsign] = frequency * 1000
+        active = len(activity) > 0
+        self.button_rx.set_active(active)
+        if self.voice_client.client_info.is_atc:
+            self.controller_window.sub_window.button_rx.set_active(active)
+        if not active:
+            return
+        # 最近发言者排在最后
+        callsign, frequency = list(activity.items())[-1]
+        self.label_rx_callsign_v.setText(callsign)
+        self.label_rx_freq_v.setText(f"{frequency / 1000:.3f}")
         if self.voice_client.client_info.is_atc:
-            self.controller_window.sub_window.button_rx.set_active(True)
-            self.controller_window.sub_window.label_rx_callsign_v.setText(voice.callsign)
+            self.controller_window.sub_window.label_rx_callsign_v.setText(callsign)
 
     def login_success(self):
         if self.voice_client.client_info.cid is None: